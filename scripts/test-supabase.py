@@ -14,7 +14,7 @@ async def main():
     load_dotenv()
     
     # Initialize Supabase
-    SupabaseClient.init()
+    await SupabaseClient.init()
     
     # Get market events from last hour
     events = await SupabaseClient.get_filtered_market_events(hours_ago=1)
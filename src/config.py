@@ -7,8 +7,72 @@ load_dotenv(env_file)
 
 class Config:
     TELEGRAM_TOKEN = os.getenv("TELEGRAM_BOT_TOKEN")
+    # Telegram user ids allowed to run control commands (/pause, /resume)
+    TELEGRAM_ALLOWED_USERS = {int(u) for u in os.getenv("TELEGRAM_ALLOWED_USERS", "").split(",") if u.strip()}
     CHAIN_RPC_URL = os.getenv("RPC_URL")
     POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", 60))
     ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
     OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
     MODEL_TYPE = os.getenv("MODEL_TYPE", "anthropic")
+
+    # Thresholds below which the periodic risk run is skipped
+    RISK_GATE_UTILIZATION_DELTA = float(os.getenv("RISK_GATE_UTILIZATION_DELTA", 0.02))  # absolute, 0.02 = 2pt
+    RISK_GATE_APY_DELTA = float(os.getenv("RISK_GATE_APY_DELTA", 0.5))  # in APY percent points
+    RISK_GATE_NET_FLOW_RATIO = float(os.getenv("RISK_GATE_NET_FLOW_RATIO", 0.02))  # net flow / total supply
+    RISK_GATE_ALLOCATION_DRIFT = float(os.getenv("RISK_GATE_ALLOCATION_DRIFT", 0.05))  # share of vault assets
+    RISK_GATE_MAX_SKIPS = int(os.getenv("RISK_GATE_MAX_SKIPS", 6))  # force a run after this many skips
+
+    # Adaptive risk scheduling
+    RISK_INTERVAL = int(os.getenv("RISK_INTERVAL", 3600))  # seconds between runs by default
+    RISK_MAX_INTERVAL = int(os.getenv("RISK_MAX_INTERVAL", 4 * 3600))  # back off up to this when quiet
+    RISK_MIN_SPACING = int(os.getenv("RISK_MIN_SPACING", 300))  # minimum seconds between two runs
+    RISK_SIGNAL_DEBOUNCE = int(os.getenv("RISK_SIGNAL_DEBOUNCE", 30))  # wait for more signals before running
+    RISK_UTILIZATION_TRIGGER = float(os.getenv("RISK_UTILIZATION_TRIGGER", 0.95))
+    RISK_LARGE_FLOW_RATIO = float(os.getenv("RISK_LARGE_FLOW_RATIO", 0.05))  # single flow / market supply
+    RISK_JITTER = int(os.getenv("RISK_JITTER", 30))  # random delay added to timer runs
+    RISK_RUN_TIMEOUT = int(os.getenv("RISK_RUN_TIMEOUT", 900))  # a risk run taking longer is cancelled
+
+    # Local outbox, every database write lands here first
+    OUTBOX_PATH = os.getenv("OUTBOX_PATH", "data/outbox.sqlite")
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", 100))  # rows per shipped batch
+    OUTBOX_FLUSH_INTERVAL = float(os.getenv("OUTBOX_FLUSH_INTERVAL", 2))  # seconds between ship attempts
+    OUTBOX_MAX_BACKOFF = float(os.getenv("OUTBOX_MAX_BACKOFF", 300))  # retry delay cap after failures
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", 8))  # a row failing alone this often is set aside
+
+    # Last block and log each chain processor handled, a restart resumes from there
+    CHAIN_CURSOR_PATH = os.getenv("CHAIN_CURSOR_PATH", "data/chain_cursor.sqlite")
+
+    # Conversation memory of the admin and user graphs
+    CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "data/checkpoints.sqlite")
+    CHECKPOINT_KEEP = int(os.getenv("CHECKPOINT_KEEP", 20))  # checkpoints kept per thread
+    CONVERSATION_MAX_TOKENS = int(os.getenv("CONVERSATION_MAX_TOKENS", 12000))  # history budget per model call
+    CONVERSATION_KEEP_TOKENS = int(os.getenv("CONVERSATION_KEEP_TOKENS", 4000))  # recent turns kept verbatim
+    USER_MESSAGE_WORKERS = int(os.getenv("USER_MESSAGE_WORKERS", 4))  # user conversations answered in parallel
+    USER_BATCH_WINDOW = float(os.getenv("USER_BATCH_WINDOW", 2.0))  # seconds user messages are collected for one run
+    USER_BATCH_SIZE = int(os.getenv("USER_BATCH_SIZE", 8))  # messages answered in one run at most
+
+    # LLM response cache
+    LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", "data/llm_cache.sqlite")
+    LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", 600))  # seconds, exact prompt matches
+
+    # LLM gateway, limits apply per model
+    LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", 4))  # calls in flight
+    LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 80000))
+    LLM_ROUTE_COMPLEX_TOKENS = int(os.getenv("LLM_ROUTE_COMPLEX_TOKENS", 6000))  # longer requests use the reasoning model
+
+    # Token budget of the market data tables, per graph
+    RISK_PROMPT_TOKENS = int(os.getenv("RISK_PROMPT_TOKENS", 2500))
+    ADMIN_PROMPT_TOKENS = int(os.getenv("ADMIN_PROMPT_TOKENS", 1500))
+    USER_PROMPT_TOKENS = int(os.getenv("USER_PROMPT_TOKENS", 800))
+
+    # Deadlines: budget per event in seconds, and caps of the calls made while handling it
+    ADMIN_MESSAGE_BUDGET = int(os.getenv("ADMIN_MESSAGE_BUDGET", 180))
+    USER_MESSAGE_BUDGET = int(os.getenv("USER_MESSAGE_BUDGET", 90))
+    RISK_UPDATE_BUDGET = int(os.getenv("RISK_UPDATE_BUDGET", 600))  # below RISK_RUN_TIMEOUT
+    CHAIN_EVENT_BUDGET = int(os.getenv("CHAIN_EVENT_BUDGET", 30))
+    LLM_CALL_TIMEOUT = int(os.getenv("LLM_CALL_TIMEOUT", 120))
+    TOOL_TIMEOUT = int(os.getenv("TOOL_TIMEOUT", 60))
+    RPC_TIMEOUT = int(os.getenv("RPC_TIMEOUT", 15))
+
+    # Refresh of the vault and market snapshots behind the admin slash commands
+    SNAPSHOT_INTERVAL = int(os.getenv("SNAPSHOT_INTERVAL", 60))  # seconds
@@ -1,4 +1,7 @@
 from .agent import Agent
 from .event_bus import EventBus
+from .scheduler import Scheduler, IntervalSpec, CronSpec
+from .worker_pool import KeyedWorkerPool
+from .micro_batcher import MicroBatcher
 
-__all__ = ['Agent', 'EventBus', 'Listener'] 
\ No newline at end of file
+__all__ = ['Agent', 'EventBus', 'Listener', 'Scheduler', 'IntervalSpec', 'CronSpec', 'KeyedWorkerPool', 'MicroBatcher'] 
\ No newline at end of file
@@ -1,6 +1,7 @@
 from typing import List, Optional, Dict, Any
 from abc import ABC, abstractmethod
 from .event_bus import EventBus
+from .scheduler import Scheduler
 from models.events import EventType
 from utils.websocket import WebSocketManager
 from utils.activity_types import *  # Import all activity types
@@ -22,8 +23,9 @@ class Listener(ABC):
 
 class Agent:
     def __init__(self):
-        """Initialize agent with event bus"""
+        """Initialize agent with event bus and job scheduler"""
         self.event_bus = EventBus()
+        self.scheduler = Scheduler()
         self.running = False
         self._ws_manager: Optional[WebSocketManager] = None
     
@@ -53,10 +55,12 @@ class Agent:
     
     async def start(self):
         self.running = True
+        await self.scheduler.start()
         await self.event_bus.publish(EventType.SYSTEM_START)
 
     async def stop(self):
         self.running = False
+        await self.scheduler.stop()
         await self.event_bus.publish(EventType.SYSTEM_SHUTDOWN)
 
 __all__ = ['Agent', 'Listener'] 
\ No newline at end of file
@@ -0,0 +1,54 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+class MicroBatcher:
+    """
+    Collects items and hands them to `flush(items)` in batches.
+
+    A batch is flushed `max_wait` seconds after its first item, or as soon as it
+    holds `max_size` items. Flushes run in the background, `add()` never waits.
+    """
+
+    def __init__(self, flush: Callable[[List[Any]], Awaitable], max_size: int = 8, max_wait: float = 2.0):
+        self.flush = flush
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self.items: List[Any] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+        self.tasks: Set[asyncio.Task] = set()
+
+    def add(self, item: Any):
+        self.items.append(item)
+        if len(self.items) >= self.max_size:
+            self._flush_now()
+        elif self.timer is None:
+            self.timer = asyncio.get_running_loop().call_later(self.max_wait, self._flush_now)
+
+    def _flush_now(self):
+        if self.timer is not None:
+            self.timer.cancel()
+            self.timer = None
+        if not self.items:
+            return
+
+        items, self.items = self.items, []
+        task = asyncio.create_task(self._run(items))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _run(self, items: List[Any]):
+        try:
+            await self.flush(items)
+        except Exception as e:
+            logger.error(f"Batch flush error ({len(items)} items): {str(e)}")
+
+    async def close(self):
+        """Flush what is collected and wait for the running flushes"""
+        self._flush_now()
+        if self.tasks:
+            await asyncio.gather(*set(self.tasks), return_exceptions=True)
+
+__all__ = ['MicroBatcher']
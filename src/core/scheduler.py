@@ -0,0 +1,299 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from datetime import date, datetime, time as dt_time, timedelta
+from typing import Awaitable, Callable, Deque, Dict, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+COALESCE = "coalesce"  # run once as soon as possible for all the slots missed while the job was busy
+SKIP = "skip"  # drop missed slots, wait for the next one
+
+@dataclass
+class IntervalSpec:
+    """Run every `seconds`"""
+    seconds: float
+
+    def next_after(self, timestamp: float) -> float:
+        return timestamp + self.seconds
+
+class CronSpec:
+    """
+    Standard 5-field cron expression: minute hour day-of-month month day-of-week.
+    Day-of-week 0 and 7 are both Sunday. As in cron, when both day fields are restricted
+    a day matches if either of them does.
+    """
+
+    RANGES = [(0, 59), (0, 23), (1, 31), (1, 12), (0, 7)]
+
+    def __init__(self, expression: str):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Invalid cron expression: {expression}")
+        self.expression = expression
+        self.minutes, self.hours, self.days, self.months, self.weekdays = [
+            self._parse_field(f, low, high) for f, (low, high) in zip(fields, self.RANGES)
+        ]
+        if 7 in self.weekdays:
+            self.weekdays = (self.weekdays - {7}) | {0}
+        self.day_or = not fields[2].startswith("*") and not fields[4].startswith("*")
+        self.sorted_hours = sorted(self.hours)
+        self.sorted_minutes = sorted(self.minutes)
+
+    @staticmethod
+    def _parse_field(value: str, low: int, high: int) -> Set[int]:
+        values = set()
+        for part in value.split(","):
+            step = 1
+            if "/" in part:
+                part, step_str = part.split("/")
+                step = int(step_str)
+            if part == "*":
+                start, end = low, high
+            elif "-" in part:
+                start, end = [int(p) for p in part.split("-")]
+            else:
+                start = end = int(part)
+            if start < low or end > high or step < 1:
+                raise ValueError(f"Cron value out of range: {value}")
+            values.update(range(start, end + 1, step))
+        return values
+
+    def _day_matches(self, day: date) -> bool:
+        if day.month not in self.months:
+            return False
+        in_days = day.day in self.days
+        in_weekdays = (day.weekday() + 1) % 7 in self.weekdays
+        return in_days or in_weekdays if self.day_or else in_days and in_weekdays
+
+    def next_after(self, timestamp: float) -> float:
+        start = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.date()
+        # Walk days, then the hours and minutes of the first matching one.
+        # A valid expression always matches within a few years (e.g. Feb 29)
+        for _ in range(366 * 5):
+            if self._day_matches(day):
+                earliest = (start.hour, start.minute) if day == start.date() else (0, 0)
+                for hour in self.sorted_hours:
+                    if hour < earliest[0]:
+                        continue
+                    for minute in self.sorted_minutes:
+                        if (hour, minute) >= earliest:
+                            return datetime.combine(day, dt_time(hour, minute)).timestamp()
+            day += timedelta(days=1)
+        raise ValueError(f"Cron expression never matches: {self.expression}")
+
+@dataclass
+class JobStats:
+    """Per-job run record"""
+    run_count: int = 0
+    missed_count: int = 0
+    failure_count: int = 0
+    last_started: Optional[float] = None
+    last_duration: Optional[float] = None
+    last_error: Optional[str] = None
+    durations: Deque[float] = field(default_factory=lambda: deque(maxlen=50))
+
+    @property
+    def avg_duration(self) -> Optional[float]:
+        return sum(self.durations) / len(self.durations) if self.durations else None
+
+    @property
+    def max_duration(self) -> Optional[float]:
+        return max(self.durations) if self.durations else None
+
+    def to_dict(self) -> dict:
+        return {
+            "run_count": self.run_count,
+            "missed_count": self.missed_count,
+            "failure_count": self.failure_count,
+            "last_started": self.last_started,
+            "last_duration": self.last_duration,
+            "avg_duration": self.avg_duration,
+            "max_duration": self.max_duration,
+            "last_error": self.last_error,
+        }
+
+@dataclass
+class Job:
+    name: str
+    func: Callable[[], Awaitable]
+    spec: object  # IntervalSpec or CronSpec
+    jitter: float = 0.0  # random delay in seconds added to each run
+    missed_policy: str = COALESCE
+    timeout: Optional[float] = None  # cancel a run that takes longer than this
+    min_spacing: float = 0.0  # minimum seconds between the start of two runs, also for triggered runs
+    run_immediately: bool = False
+    next_run: float = 0.0
+    running: bool = False
+    paused: bool = False  # slots of a paused job pass without running it
+    triggered_at: Optional[float] = None
+    stats: JobStats = field(default_factory=JobStats)
+    wakeup: asyncio.Event = field(default_factory=asyncio.Event)
+
+class Scheduler:
+    """
+    Runs timed jobs. Each job has its own loop, so a job never overlaps with itself (single-flight):
+    slots that pass while a run is in progress are counted as missed and handled by the job's policy.
+    """
+
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self.tasks: Dict[str, asyncio.Task] = {}
+        self.is_running = False
+
+    def add_job(self, name: str, func: Callable[[], Awaitable], spec, **options) -> Job:
+        """Register a job, start it right away if the scheduler is already running"""
+        if name in self.jobs:
+            raise ValueError(f"Job {name} already registered")
+
+        job = Job(name=name, func=func, spec=spec, **options)
+        now = time.time()
+        job.next_run = now if job.run_immediately else self._schedule_after(job, now)
+        self.jobs[name] = job
+
+        if self.is_running:
+            self.tasks[name] = asyncio.create_task(self._job_loop(job))
+        return job
+
+    def remove_job(self, name: str):
+        """Unregister a job and cancel its loop"""
+        self.jobs.pop(name, None)
+        task = self.tasks.pop(name, None)
+        if task:
+            task.cancel()
+
+    def trigger(self, name: str, delay: float = 0.0):
+        """Bring the next run of a job forward, respecting its minimum spacing"""
+        job = self.jobs[name]
+        run_at = time.time() + delay
+        if job.running:
+            job.triggered_at = min(job.triggered_at or run_at, run_at)
+            return
+        if job.stats.last_started:
+            run_at = max(run_at, job.stats.last_started + job.min_spacing)
+        if run_at < job.next_run:
+            job.next_run = run_at
+            job.wakeup.set()
+
+    def reschedule(self, name: str, spec):
+        """Change the spec of a job, takes effect from its next run"""
+        job = self.jobs[name]
+        job.spec = spec
+        if not job.running:
+            job.next_run = self._schedule_after(job, job.stats.last_started or time.time())
+            job.wakeup.set()
+
+    def pause(self, name: str):
+        """Stop running a job until it is resumed, a run in progress is not interrupted"""
+        self.jobs[name].paused = True
+
+    def resume(self, name: str):
+        self.jobs[name].paused = False
+
+    def stats(self) -> Dict[str, dict]:
+        return {name: job.stats.to_dict() for name, job in self.jobs.items()}
+
+    async def start(self):
+        self.is_running = True
+        for name, job in self.jobs.items():
+            if name not in self.tasks:
+                self.tasks[name] = asyncio.create_task(self._job_loop(job))
+        logger.info(f"Scheduler started with {len(self.jobs)} jobs")
+
+    async def stop(self):
+        self.is_running = False
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks = {}
+        logger.info("Scheduler stopped")
+
+    def _schedule_after(self, job: Job, timestamp: float) -> float:
+        return job.spec.next_after(timestamp) + random.uniform(0, job.jitter)
+
+    async def _job_loop(self, job: Job):
+        while self.is_running:
+            try:
+                delay = job.next_run - time.time()
+                if delay > 0:
+                    try:
+                        # Woken up early when the job is triggered or rescheduled
+                        await asyncio.wait_for(job.wakeup.wait(), timeout=delay)
+                        job.wakeup.clear()
+                        continue
+                    except asyncio.TimeoutError:
+                        pass
+
+                scheduled = job.next_run
+                if job.paused:
+                    job.triggered_at = None
+                    job.next_run = self._schedule_after(job, time.time())
+                    continue
+
+                await self._execute(job)
+                self._plan_next_run(job, scheduled)
+
+            except asyncio.CancelledError:
+                break
+            except Exception as e:
+                logger.error(f"Scheduler: job {job.name} loop error: {str(e)}")
+                job.next_run = self._schedule_after(job, time.time())
+
+    async def _execute(self, job: Job):
+        job.running = True
+        job.wakeup.clear()
+        started = time.time()
+        job.stats.last_started = started
+        try:
+            if job.timeout:
+                await asyncio.wait_for(job.func(), timeout=job.timeout)
+            else:
+                await job.func()
+            job.stats.last_error = None
+        except asyncio.TimeoutError:
+            job.stats.failure_count += 1
+            job.stats.last_error = f"timed out after {job.timeout}s"
+            logger.error(f"Scheduler: job {job.name} timed out after {job.timeout}s")
+        except Exception as e:
+            job.stats.failure_count += 1
+            job.stats.last_error = str(e)
+            logger.error(f"Scheduler: job {job.name} failed: {str(e)}")
+        finally:
+            job.running = False
+            duration = time.time() - started
+            job.stats.run_count += 1
+            job.stats.last_duration = duration
+            job.stats.durations.append(duration)
+            logger.info(f"Scheduler: job {job.name} ran in {duration:.2f}s")
+
+    def _plan_next_run(self, job: Job, scheduled: float):
+        now = time.time()
+
+        # Count the slots that passed while the job was running
+        missed = 0
+        slot = job.spec.next_after(scheduled)
+        while slot <= now:
+            missed += 1
+            slot = job.spec.next_after(slot)
+
+        if missed:
+            job.stats.missed_count += missed
+            logger.warning(f"Scheduler: job {job.name} missed {missed} run(s)")
+
+        if missed and job.missed_policy == COALESCE:
+            job.next_run = max(now, job.stats.last_started + job.min_spacing)
+        elif missed:
+            job.next_run = self._schedule_after(job, now)
+        else:
+            job.next_run = self._schedule_after(job, scheduled)
+
+        # Triggers received during the run are honoured right after it
+        if job.triggered_at is not None:
+            job.next_run = min(job.next_run, max(job.triggered_at, job.stats.last_started + job.min_spacing))
+            job.triggered_at = None
+
+__all__ = ['Scheduler', 'IntervalSpec', 'CronSpec', 'JobStats', 'COALESCE', 'SKIP']
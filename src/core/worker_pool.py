@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Set
+
+logger = logging.getLogger(__name__)
+
+class KeyedWorkerPool:
+    """
+    Runs `worker(item)` for submitted items, up to `max_workers` at a time.
+
+    Items sharing a key run one after the other in submission order, items of
+    different keys run in parallel. `submit()` never waits for the work itself.
+    """
+
+    def __init__(self, worker: Callable[[Any], Awaitable], max_workers: int = 4):
+        self.worker = worker
+        self.slots = asyncio.Semaphore(max_workers)
+        self.queues: Dict[Hashable, Deque[Any]] = {}
+        self.tasks: Set[asyncio.Task] = set()
+
+    def submit(self, key: Hashable, item: Any):
+        """Queue an item behind the pending items of the same key"""
+        if key in self.queues:
+            self.queues[key].append(item)
+            return
+
+        # No drainer for this key yet
+        self.queues[key] = deque([item])
+        task = asyncio.create_task(self._drain(key))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _drain(self, key: Hashable):
+        queue = self.queues[key]
+        try:
+            while queue:
+                item = queue[0]
+                async with self.slots:
+                    try:
+                        await self.worker(item)
+                    except Exception as e:
+                        logger.error(f"Worker error for {key}: {str(e)}")
+                queue.popleft()
+        finally:
+            del self.queues[key]
+
+    def is_pending(self, key: Hashable) -> bool:
+        """Whether items of this key are queued or running"""
+        return key in self.queues
+
+    @property
+    def pending(self) -> int:
+        return sum(len(queue) for queue in self.queues.values())
+
+    async def close(self, timeout: float = 10.0):
+        """Let the running items finish for up to `timeout` seconds, then cancel"""
+        if not self.tasks:
+            return
+        _, still_running = await asyncio.wait(set(self.tasks), timeout=timeout)
+        for task in still_running:
+            task.cancel()
+        await asyncio.gather(*still_running, return_exceptions=True)
+
+__all__ = ['KeyedWorkerPool']
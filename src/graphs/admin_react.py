@@ -7,16 +7,16 @@ from utils.reasoning import create_reasoning_tool
 from utils.model_util import get_llm
 from utils.constants import VAULT_ADDRESS
 from utils.cdp import cdp_tools
-from langgraph.checkpoint.memory import MemorySaver
-memory = MemorySaver()
+from utils.checkpointer import get_checkpointer
+from utils.conversation import create_history_window
 
 # Factory function to create the agent with access to the WebSocket manager
 def create_admin_agent(agent):
     # Get market tools with agent access for WebSocket broadcasting
-    market_tools = create_market_tools(agent)
+    market_tools = create_market_tools(agent, token_budget=Config.ADMIN_PROMPT_TOKENS)
     
     # Get reasoning tool with agent access
-    market_analysis = create_reasoning_tool(agent)
+    market_analysis = create_reasoning_tool(agent, priority="admin")
     
     tools = [
         # Disable temporary reallocation tool
@@ -27,13 +27,15 @@ def create_admin_agent(agent):
         market_analysis
     ]
     
-    executor_llm = get_llm(Config.MODEL_TYPE, is_interpreter=True)
+    # Admin commands go first, analytical ones are routed to the reasoning model
+    executor_llm = get_llm(Config.MODEL_TYPE, is_interpreter=True, priority="admin", auto_route=True)
     
     # Create the React agent with the tools
     react_agent = create_react_agent(
         executor_llm,
         tools=tools,
-        checkpointer=memory,
+        checkpointer=get_checkpointer(),
+        pre_model_hook=create_history_window(priority="admin"),
         state_modifier="""You are an assistant that govern morpho vault, who is in charge of balancing the supplied asset across different markets with in vault.
         You listen to the admin message and execute the command.
 
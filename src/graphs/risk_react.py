@@ -14,10 +14,10 @@ from langgraph.checkpoint.memory import MemorySaver
 # Factory function to create the agent with access to the WebSocket manager
 def create_risk_agent(agent):
     # Get market tools with agent access for WebSocket broadcasting
-    market_tools = create_market_tools(agent)
+    market_tools = create_market_tools(agent, token_budget=Config.RISK_PROMPT_TOKENS)
     
     # Get reasoning tool with agent access
-    market_analysis = create_reasoning_tool(agent)
+    market_analysis = create_reasoning_tool(agent, priority="risk")
     
     tools = [
         *cdp_tools,
@@ -26,7 +26,7 @@ def create_risk_agent(agent):
     ]
     
     # Use a smarter model for reasoning and generate updates
-    executor_llm = get_llm(Config.MODEL_TYPE, is_interpreter=False)
+    executor_llm = get_llm(Config.MODEL_TYPE, is_interpreter=False, priority="risk")
     
     # Create the React agent with the tools
     react_agent = create_react_agent(
@@ -47,7 +47,11 @@ def create_risk_agent(agent):
         
         Most importnatly, you need to use the MorphoActionProvider_reallocate tool to execute the transaction after you determine the best strategy.
 
+        Do not compute the reallocation amounts by hand: call optimize_reallocation, which solves the constraints above and returns a reallocation list ready for MorphoActionProvider_reallocate.
+        Review the plan against your analysis before executing it.
+
         Other useful tools:
+        - optimize_reallocation: Use it to get the best allocation and the exact reallocation list.
         - market_analysis: Use it to have deeper insight on the market data.
         - MorphoActionProvider_reallocate: Use it to execute the reallocation transaction.
         - post_tweet: Use it to post a tweet.
@@ -8,16 +8,20 @@ from utils.model_util import get_llm
 from utils.reasoning import create_reasoning_tool
 from utils.cdp import cdp_tools
 
-from langgraph.checkpoint.memory import MemorySaver
-memory = MemorySaver()
+from utils.checkpointer import get_checkpointer
+from utils.conversation import create_history_window
 
 # Factory function to create the agent with access to the WebSocket manager
-def create_user_agent(agent):
+def create_user_agent(agent, batch: bool = False):
+    """
+    User agent, conversations are checkpointed per sender. With `batch` (one-off runs
+    answering several senders) there is no checkpointer and no response cache.
+    """
     # Get market tools with agent access for WebSocket broadcasting
-    market_tools = create_market_tools(agent)
+    market_tools = create_market_tools(agent, token_budget=Config.USER_PROMPT_TOKENS)
     
     # Get reasoning tool with agent access
-    market_analysis = create_reasoning_tool(agent)
+    market_analysis = create_reasoning_tool(agent, priority="user")
     
     tools = [
         *market_tools,
@@ -26,13 +30,15 @@ def create_user_agent(agent):
         market_analysis,
     ]
 
-    executor_llm = get_llm(Config.MODEL_TYPE, is_interpreter=True)
+    # An identical prompt in the sender's thread on the same vault state is answered from the cache
+    executor_llm = get_llm(Config.MODEL_TYPE, is_interpreter=True, cache=None if batch else "exact", priority="user")
     
     # Create the React agent with the tools
     react_agent = create_react_agent(
         executor_llm,
         tools=tools,
-        checkpointer=memory,
+        checkpointer=None if batch else get_checkpointer(),
+        pre_model_hook=create_history_window(priority="user"),
         state_modifier="""Your name is M1 Agent, a manager of Morpho Vault, who give insights and analysis across different markets within the vault.
         You listen to the user message and friendly response to user, in easy and casual tone.
 
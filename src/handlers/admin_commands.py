@@ -0,0 +1,118 @@
+from listeners.timer_listener import RISK_UPDATE_JOB
+from config import Config
+from utils.snapshots import snapshots, VAULT, ALLOCATIONS, MARKETS, LAST_RISK, LAST_REALLOCATION
+from typing import Optional
+import time
+
+HELP = """Commands:
+/status - vault overview and risk schedule
+/alloc - current allocations
+/markets - vault markets
+/lastrisk - last risk analysis and reallocation
+/pause - pause the periodic risk analysis (allowed users only, until restart)
+/resume - resume it (allowed users only)
+Anything else goes to the agent."""
+
+NO_SNAPSHOT = "No snapshot yet, try again in a minute."
+
+# Commands changing what the agent does, restricted to Config.TELEGRAM_ALLOWED_USERS
+CONTROL_COMMANDS = {"pause", "resume"}
+
+def _age(seconds: float) -> str:
+    if seconds < 60:
+        return f"{seconds:.0f}s ago"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f}m ago"
+    return f"{seconds / 3600:.1f}h ago"
+
+class AdminCommands:
+    """
+    Slash commands answered from the latest snapshots, without the admin graph.
+
+    Answers never touch the network or the LLM, they take milliseconds. Control
+    commands are only run for the user ids listed in TELEGRAM_ALLOWED_USERS.
+    """
+
+    def __init__(self, agent):
+        self.agent = agent
+        self.commands = {
+            "status": self._status,
+            "alloc": self._alloc,
+            "markets": self._markets,
+            "lastrisk": self._last_risk,
+            "pause": self._pause,
+            "resume": self._resume,
+            "help": lambda: HELP,
+        }
+
+    def dispatch(self, text: str, user_id: Optional[int] = None) -> Optional[str]:
+        """Answer to a slash command sent by `user_id`, None for free text"""
+        if not text.startswith("/"):
+            return None
+        # Commands may be addressed to the bot in groups: /status@bot_name
+        name = text.split()[0][1:].split("@")[0].lower()
+        if name in CONTROL_COMMANDS and user_id not in Config.TELEGRAM_ALLOWED_USERS:
+            return f"/{name} is only allowed for the users listed in TELEGRAM_ALLOWED_USERS."
+        command = self.commands.get(name)
+        return command() if command else f"Unknown command /{name}\n\n{HELP}"
+
+    def _status(self) -> str:
+        lines = []
+        vault = snapshots.get(VAULT)
+        if vault:
+            state, age = vault
+            lines.append(
+                f"Vault: TVL ${state['tvl_usd']:,.0f}, APY {state['apy'] * 100:.2f}%, "
+                f"all-time APY {state['all_time_apy'] * 100:.2f}%, {state['markets']} markets ({_age(age)})"
+            )
+        else:
+            lines.append(f"Vault: {NO_SNAPSHOT}")
+
+        job = self.agent.scheduler.jobs.get(RISK_UPDATE_JOB)
+        if job:
+            last = f"last run {_age(time.time() - job.stats.last_started)}" if job.stats.last_started else "not run yet"
+            # The paused state is kept in memory only
+            schedule = "paused until /resume or restart" if job.paused else f"next run in {max(job.next_run - time.time(), 0):.0f}s"
+            lines.append(f"Risk analysis: {schedule}, {last}")
+        return "\n".join(lines)
+
+    def _alloc(self) -> str:
+        allocations = snapshots.get(ALLOCATIONS)
+        if not allocations:
+            return NO_SNAPSHOT
+        summary, age = allocations
+        return f"{summary}\n({_age(age)})"
+
+    def _markets(self) -> str:
+        markets = snapshots.get(MARKETS)
+        if not markets:
+            return NO_SNAPSHOT
+        table, age = markets
+        return f"{table}\n({_age(age)})"
+
+    def _last_risk(self) -> str:
+        lines = []
+        risk = snapshots.get(LAST_RISK)
+        if risk:
+            report, age = risk
+            lines.append(f"Last risk analysis ({_age(age)}), triggered by: {report['trigger']}\n\n{report['report']}")
+        else:
+            lines.append("No risk analysis since the agent started.")
+
+        reallocation = snapshots.get(LAST_REALLOCATION)
+        if reallocation:
+            tx_hash, age = reallocation
+            lines.append(f"Last reallocation ({_age(age)}): {tx_hash}")
+        return "\n\n".join(lines)
+
+    def _pause(self) -> str:
+        if RISK_UPDATE_JOB not in self.agent.scheduler.jobs:
+            return "Risk analysis is not scheduled."
+        self.agent.scheduler.pause(RISK_UPDATE_JOB)
+        return "Periodic risk analysis paused, /resume to restart it. A restart of the agent resumes it too."
+
+    def _resume(self) -> str:
+        if RISK_UPDATE_JOB not in self.agent.scheduler.jobs:
+            return "Risk analysis is not scheduled."
+        self.agent.scheduler.resume(RISK_UPDATE_JOB)
+        return "Periodic risk analysis resumed."
@@ -1,10 +1,12 @@
 from models.events import EventType, BaseEvent
 from models.messages import TelegramMessage
 from .base_handler import BaseHandler
+from .admin_commands import AdminCommands
 from graphs.admin_react import create_admin_agent
 from langchain_core.messages import HumanMessage
 from utils import send_telegram_message_async
 from utils.supabase import SupabaseClient
+from utils.tool_memo import tool_memo_scope
 from utils.activity_types import MESSAGE_RECEIVED, IDLE
 import logging
 
@@ -16,6 +18,7 @@ class AdminMessageHandler(BaseHandler):
     def __init__(self, agent):
         super().__init__(agent)
         self.llm = create_admin_agent(agent)
+        self.commands = AdminCommands(agent)
 
         logger.info("AdminMessageHandler initialized")
 
@@ -25,6 +28,12 @@ class AdminMessageHandler(BaseHandler):
 
     async def handle(self, event: BaseEvent):
         if self._is_admin_message(event):
+            # Slash commands are answered from snapshots, free text goes to the graph
+            command_response = self.commands.dispatch(event.data.text, event.data.user_id)
+            if command_response is not None:
+                await send_telegram_message_async(event.data.chat_id, command_response)
+                return
+
             # Broadcast that we received a message
             await self.agent.broadcast_activity(MESSAGE_RECEIVED, {
                 "sender": "admin",
@@ -51,15 +60,24 @@ class AdminMessageHandler(BaseHandler):
 
             await self.agent.broadcast_activity(IDLE, {})
 
+    async def on_timeout(self, event: BaseEvent):
+        # Let the admin know instead of leaving the command unanswered
+        await send_telegram_message_async(
+            event.data.chat_id,
+            "Sorry, this took too long and was cancelled. Please try again, or split the request."
+        )
+
     def _is_admin_message(self, event):
         # Implement admin check logic
         return True
 
     async def _process_admin_command(self, message: TelegramMessage):
         # Process through the graph
-        state = await self.llm.ainvoke({
-            "messages": [HumanMessage(content=message.text)]
-        }, config={"configurable": {"thread_id": "admin_chat"}})
-        
+        with tool_memo_scope() as tool_memo:
+            state = await self.llm.ainvoke({
+                "messages": [HumanMessage(content=message.text)]
+            }, config={"configurable": {"thread_id": "admin_chat"}})
+        logger.info(f"Admin run tool memo: {tool_memo.stats()}")
+
         return state['messages'][-1].content
 
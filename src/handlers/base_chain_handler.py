@@ -1,18 +1,26 @@
 from .base_handler import BaseHandler
-from models.events import EventType
-from utils.market import MarketInfo, get_vault_markets
+from models.events import EventType, BaseEvent
+from config import Config
+from core.scheduler import IntervalSpec
+from utils.market import MarketInfo, get_vault_markets, market_reader
 from utils.supabase import SupabaseClient
+from utils.constants import MIN_EVENT_ASSETS
+from utils.llm_cache import invalidate_llm_cache
+from utils.flow_rollup import flow_rollup
 from utils.activity_types import (
     MB_DEPOSIT_DETECTED, MB_WITHDRAWAL_DETECTED, 
     MB_BORROW_DETECTED, MB_REPAY_DETECTED
 )
-import asyncio
+import time
+from datetime import datetime, timezone
 from typing import Dict
 import logging
 
 # Get the standard Python logger
 logger = logging.getLogger(__name__)
 
+TRACKED_MARKETS_REFRESH = 6 * 3600  # seconds
+
 
 class BaseChainEventHandler(BaseHandler):
     """
@@ -22,16 +30,23 @@ class BaseChainEventHandler(BaseHandler):
     def __init__(self, agent):
         super().__init__(agent)
         self.tracked_markets: Dict[str, MarketInfo] = {}  # market_id -> MarketInfo
+        self.last_utilization: Dict[str, float] = {}  # market_id -> last seen utilization
         
-        # Initialize tracked markets
-        asyncio.create_task(self._init_tracked_markets())
+        # Refresh tracked markets as the vault enables new markets, the first load
+        # is awaited by main before the listeners start (see refresh_tracked_markets)
+        agent.scheduler.add_job(
+            "refresh_tracked_markets",
+            self.refresh_tracked_markets,
+            IntervalSpec(TRACKED_MARKETS_REFRESH),
+            jitter=60
+        )
     
     def _normalize_market_id(self, market_id: str) -> str:
         """Normalize market ID by removing '0x' prefix if present"""
         return market_id.lower().replace('0x', '')
     
-    async def _init_tracked_markets(self):
-        """Initialize the list of markets we want to track"""
+    async def refresh_tracked_markets(self):
+        """Load the list of markets we want to track, events of other markets are dropped"""
         try:
             market_infos = await get_vault_markets()
             # Store markets with normalized IDs
@@ -57,8 +72,9 @@ class BaseChainEventHandler(BaseHandler):
             return
 
         try:
-            # Skip vault events for now
+            # Skip vault events for now, a deposit changes the vault state cached answers were based on
             if event.data.get('source') == "morpho_vault":
+                invalidate_llm_cache()
                 return
 
             # Extract and normalize market_id from the event
@@ -75,15 +91,21 @@ class BaseChainEventHandler(BaseHandler):
             
             try:
                 assets = int(event.data.get('assets', '0'))
-                if assets < 10_000000:  # Skip small transactions
+                if assets < MIN_EVENT_ASSETS:  # Skip small transactions
                     return
             except ValueError:
                 return
 
+            # The rollup table buckets by created_at, the local window uses the same time
+            created_at = time.time()
             event_data = {
+                "created_at": datetime.fromtimestamp(created_at, timezone.utc).isoformat(),
                 "market": market_id,
                 "event": event.data.get('evm_event'),
                 "amount": assets,
+                "tx_hash": event.data.get('tx_hash'),
+                "log_index": event.data.get('log_index'),
+                "block_number": event.data.get('block_number'),
                 "data": {
                     "tx_hash": event.data.get('tx_hash'),
                     "caller": event.data.get('caller'),
@@ -92,15 +114,62 @@ class BaseChainEventHandler(BaseHandler):
                 }
             }
 
-            # Store event in Supabase
+            # Store event in Supabase (once per log), the rollup table is updated by a trigger
             await SupabaseClient.store_onchain_events(event_data)
+            flow_rollup.record(
+                market_id,
+                event.data.get('evm_event'),
+                assets,
+                created_at,
+                event.data.get('block_number')
+            )
             
             # Broadcast activity based on event type
             await self._broadcast_morpho_blue_activity(event.data, market_id, assets)
+
+            # Ask for an early risk update if this flow moved the market
+            await self._publish_risk_signal(market_id, event.data.get('evm_event'), assets)
                 
         except Exception as e:
             logger.error(f"ChainHandler: {str(e)}")
     
+    async def _publish_risk_signal(self, market_id: str, evm_event: str, assets: int):
+        """Publish a RISK_SIGNAL on large flows or when utilization crosses the trigger level"""
+        stats = await market_reader.get_market_data(market_id)
+        if not stats or not stats['supply_assets']:
+            return
+
+        utilization = stats['borrow_assets'] / stats['supply_assets']
+        flow_ratio = assets / stats['supply_assets']
+        # The first reading of a market only seeds it, a crossing needs a reading below the level
+        previous = self.last_utilization.get(market_id)
+        self.last_utilization[market_id] = utilization
+
+        reasons = []
+        if flow_ratio >= Config.RISK_LARGE_FLOW_RATIO:
+            reasons.append(f"large {evm_event} ({flow_ratio * 100:.1f}% of supply)")
+        if previous is not None and previous < Config.RISK_UTILIZATION_TRIGGER <= utilization:
+            reasons.append(f"utilization crossed {Config.RISK_UTILIZATION_TRIGGER * 100:.0f}% ({utilization * 100:.1f}%)")
+
+        if not reasons:
+            return
+
+        market_info = self.tracked_markets.get(market_id)
+        signal = BaseEvent(
+            type=EventType.RISK_SIGNAL,
+            data={
+                "market_id": market_id,
+                "market": market_info.display_name if market_info else market_id,
+                "event": evm_event,
+                "utilization": utilization,
+                "flow_ratio": flow_ratio,
+                "reasons": reasons
+            },
+            source="chain_handler",
+            timestamp=time.time()
+        )
+        await self.agent.event_bus.publish(EventType.RISK_SIGNAL, signal)
+
     async def _broadcast_morpho_blue_activity(self, event_data, market_id, assets):
         """Broadcast activity for Morpho Blue events"""
         event_type = event_data.get('evm_event', '')
@@ -1,5 +1,24 @@
 from abc import ABC, abstractmethod
+from typing import Awaitable, Optional
 from models.events import BaseEvent, EventType
+from config import Config
+from utils.deadline import DeadlineExceeded, deadline_scope
+from utils.activity_types import HANDLER_TIMEOUT
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Seconds a handler may spend on one event, the run is cancelled past it.
+# User messages are only queued by their handler, each answer has its own budget.
+EVENT_BUDGETS = {
+    EventType.TELEGRAM_MESSAGE: Config.ADMIN_MESSAGE_BUDGET,
+    EventType.RISK_UPDATE: Config.RISK_UPDATE_BUDGET,
+    EventType.CHAIN_EVENT: Config.CHAIN_EVENT_BUDGET,
+}
+
+class BudgetExceeded(DeadlineExceeded):
+    """The work of a handler ran out of its budget and was cancelled"""
 
 class BaseHandler(ABC):
     def __init__(self, agent):
@@ -9,7 +28,7 @@ class BaseHandler(ABC):
     def _register_subscriptions(self):
         """Auto-register on init"""
         for event_type in self.subscribes_to:
-            self.agent.event_bus.subscribe(event_type, self.handle)
+            self.agent.event_bus.subscribe(event_type, self._handle_within_budget)
 
     @property
     @abstractmethod
@@ -20,4 +39,51 @@ class BaseHandler(ABC):
     @abstractmethod
     async def handle(self, event: BaseEvent):
         """Handle an incoming event"""
-        pass 
\ No newline at end of file
+        pass
+
+    async def on_timeout(self, event: BaseEvent):
+        """Called when handling an event ran out of budget"""
+        pass
+
+    async def _handle_within_budget(self, event: BaseEvent):
+        event_type = getattr(event, "type", None)
+        label = getattr(event_type, "value", "event")
+        try:
+            await self.run_within_budget(self.handle(event), EVENT_BUDGETS.get(event_type), label)
+        except BudgetExceeded:
+            await self.on_timeout(event)
+        except asyncio.TimeoutError as e:
+            # A call inside the handler timed out on its own, the event budget was not spent
+            logger.error(f"{type(self).__name__}: {label} failed, a call timed out: {str(e)}")
+
+    async def run_within_budget(self, work: Awaitable, budget: Optional[float], label: str, reset: bool = False):
+        """
+        Await `work` with a deadline `budget` seconds from now.
+
+        The deadline propagates to the graph, tool and I/O calls made by the work. Past
+        it the work is cancelled, a timeout activity is broadcast and BudgetExceeded
+        is raised. A timeout raised inside the work before that (e.g. an LLM call
+        past LLM_CALL_TIMEOUT) propagates unchanged. `reset` drops a deadline
+        inherited from the caller.
+        """
+        if budget is None:
+            return await work
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        with deadline_scope(budget, reset=reset):
+            try:
+                return await asyncio.wait_for(work, timeout=budget)
+            except asyncio.TimeoutError as e:
+                elapsed = loop.time() - started
+                if elapsed < budget:
+                    raise
+                logger.error(f"{type(self).__name__}: {label} cancelled after {elapsed:.1f}s (budget {budget}s): {str(e)}")
+                await self.agent.broadcast_activity(HANDLER_TIMEOUT, {
+                    "handler": type(self).__name__,
+                    "work": label,
+                    "budget": budget,
+                    "elapsed": elapsed,
+                    "reason": str(e) or "budget exceeded"
+                })
+                raise BudgetExceeded(f"{label} exceeded its {budget}s budget") from e
@@ -1,9 +1,14 @@
 from datetime import datetime, timezone
 from handlers.base_handler import BaseHandler
 from models.events import EventType
-from utils.market import get_all_market_history, format_market_history, get_vault_allocations_summary
+from utils.market import get_all_market_history, format_market_history, format_flow_horizons, get_vault_allocations_summary, get_vault_allocations
+from utils.change_detection import ChangeDetector
 from utils.supabase import SupabaseClient
-from utils.activity_types import PERIODIC_ANALYSIS_STARTED, PERIODIC_ANALYSIS_COMPLETED
+from utils.tool_memo import tool_memo_scope
+from utils.prompt_encoding import estimate_tokens, split_budget
+from utils.snapshots import snapshots, LAST_RISK
+from config import Config
+from utils.activity_types import PERIODIC_ANALYSIS_STARTED, PERIODIC_ANALYSIS_COMPLETED, PERIODIC_ANALYSIS_SKIPPED
 from langchain_core.messages import HumanMessage
 from web3 import Web3
 import os
@@ -19,10 +24,13 @@ class PeriodicRiskHandler(BaseHandler):
     def __init__(self, agent):
         super().__init__(agent)
         # Initialize Web3
-        self.web3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL")))
+        self.web3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL"), request_kwargs={"timeout": Config.RPC_TIMEOUT}))
         self.hours_ago = 1
         # Create the risk agent with access to broadcast capabilities
         self.llm = create_risk_agent(agent)
+        # Skips the LLM run when nothing material changed since the last analysis
+        self.change_detector = ChangeDetector()
+        self.last_tool_stats = {}
     
     @property
     def subscribes_to(self):
@@ -55,50 +63,92 @@ class PeriodicRiskHandler(BaseHandler):
                     'repay': int(market['repay'])
                 }
                 await SupabaseClient.store_market_snapshot(snapshot)
-            
+
+            allocations = await get_vault_allocations()
+            if event.data.get('type') == 'signal_triggered':
+                # Early runs are requested by market signals, they are material by definition
+                reasons = [f"{signal['market']}: {r}" for signal in event.data.get('signals', []) for r in signal['reasons']]
+            else:
+                reasons = self.change_detector.material_changes(market_summaries, allocations)
+            if not reasons:
+                self.change_detector.mark_skipped()
+                event.data['outcome'] = 'skipped'
+                logger.info("No material market change, skipping risk analysis")
+                await self.agent.broadcast_activity(PERIODIC_ANALYSIS_SKIPPED, {
+                    "interval_hours": self.hours_ago,
+                    "skipped_runs": self.change_detector.skipped_runs
+                })
+                return
+
+            logger.info(f"Running risk analysis: {'; '.join(reasons)}")
+
             # Pass data to risk analysis
-            result = await self.analyze_risk(market_summaries)
+            result = await self.analyze_risk(market_summaries, reasons, set(allocations))
+            self.change_detector.mark_analyzed(market_summaries, allocations)
             
             # Broadcast analysis completion
             await self.agent.broadcast_activity(PERIODIC_ANALYSIS_COMPLETED, {
                 "interval_hours": self.hours_ago,
-                "report_length": len(result) if result else 0
+                "report_length": len(result) if result else 0,
+                "tool_memo": self.last_tool_stats
             })
             
         except Exception as e:
+            event.data['outcome'] = 'failed'
             logger.error(f"PeriodicRiskHandler: Error in risk update: {str(e)}")
             
-    async def analyze_risk(self, market_data):
-        """Analyze market risk using LLM"""
+    async def on_timeout(self, event):
+        # Nothing was decided, the timer keeps the default interval like after a failure
+        event.data['outcome'] = 'timed_out'
+
+    async def analyze_risk(self, market_data, reasons=None, vault_markets=None):
+        """Analyze market risk using LLM, flow tables are limited to `vault_markets` (ids without 0x)"""
 
         activity_id = str(uuid.uuid4())
 
-        # Format data for LLM consumption
-        market_history_summary = await format_market_history(market_data)
-        
+        # The allocation table is always complete, the flow tables share what is left of the budget
         vault_allocation_summary = await get_vault_allocations_summary()
+        budget = split_budget(max(Config.RISK_PROMPT_TOKENS - estimate_tokens(vault_allocation_summary), 0), history=2, flows=1)
+
+        market_history_summary = await format_market_history(market_data, budget['history'], vault_markets)
+        
+        flow_horizons = await format_flow_horizons(max_tokens=budget['flows'], market_ids=vault_markets)
 
         prompt = f"""
         [Automated Trigger Message] 
         activity_id: {activity_id}
-        Here is the market activity in the last {self.hours_ago} hours:
+        Triggered by: {'; '.join(reasons or ['periodic check'])}
+        Here is the market activity in the last {self.hours_ago} hours (amounts in thousands of USDC):
         {market_history_summary}
 
+        Net flows over longer horizons:
+        {flow_horizons}
+
         Current Vault allocation
         {vault_allocation_summary}
+
+        The flow tables only list vault markets, their ids are the first 8 hex digits of the full ids listed in the vault allocation.
         """
         
-        state = await self.llm.ainvoke({
-            "messages": [HumanMessage(content=prompt)]
-        }, config={"configurable": {"thread_id": "risk_analysis"}})
+        thread_id = "risk_analysis"
+        with tool_memo_scope() as tool_memo:
+            state = await self.llm.ainvoke({
+                "messages": [HumanMessage(content=prompt)]
+            }, config={"configurable": {"thread_id": thread_id}})
+        self.last_tool_stats = tool_memo.stats()
 
-        # Store full message history
-        await SupabaseClient.store_activity(activity_id, state['messages'], "PERIODIC_CHECK")
+        # The risk graph keeps no checkpoints, each run is stored standalone
+        await SupabaseClient.store_activity(activity_id, state['messages'], "PERIODIC_CHECK", tool_stats=self.last_tool_stats)
 
         # for all messages in state[messages], find things we want to print
         content = state['messages'][-1].content
 
         await SupabaseClient.store_report("hourly", content, activity_id)
+        snapshots.record(LAST_RISK, {
+            "activity_id": activity_id,
+            "trigger": '; '.join(reasons or ['periodic check']),
+            "report": content
+        })
 
         
 
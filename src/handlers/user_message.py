@@ -1,67 +1,230 @@
 from models.events import EventType, BaseEvent
 from models.messages import TelegramMessage, ChainMessage
-from .base_handler import BaseHandler
+from .base_handler import BaseHandler, BudgetExceeded
 from graphs.user_react import create_user_agent
-from langchain_core.messages import HumanMessage
+from langchain_core.messages import AIMessage, HumanMessage
+from core.micro_batcher import MicroBatcher
+from core.worker_pool import KeyedWorkerPool
+from config import Config
 from utils.supabase import SupabaseClient
+from utils.tool_memo import tool_memo_scope
 from utils.activity_types import MESSAGE_RECEIVED
+from typing import Dict, List
+import asyncio
 import logging
+import re
 
 # Get the standard Python logger
 logger = logging.getLogger(__name__)
 
+batch_prompt = """Several users wrote to you at the same time. Answer each message separately, as if you were talking to its sender only.
+Start each answer with the tag of the message it answers, e.g. [1], and write nothing outside the answers.
+
+{messages}"""
+
+REPLY_TAG = re.compile(r"^\s*\[(\d+)\]\s*", re.MULTILINE)
+
+def _text(content) -> str:
+    """Text of a message content, Anthropic returns a list of content blocks"""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content if isinstance(block, dict))
+
+def _split_replies(text: str) -> Dict[int, str]:
+    """Answers of a batch reply, by message tag"""
+    tags = list(REPLY_TAG.finditer(text))
+    replies = {}
+    for i, tag in enumerate(tags):
+        end = tags[i + 1].start() if i + 1 < len(tags) else len(text)
+        reply = text[tag.end():end].strip()
+        if reply:
+            replies[int(tag.group(1))] = reply
+    return replies
+
 class UserMessageHandler(BaseHandler):
     """Entry point to handle user messages (from telegram or onchain)"""
 
     def __init__(self, agent):
         super().__init__(agent)
         self.llm = create_user_agent(agent)
+        # Batches are answered once and never continued, they keep no thread of their own
+        self.batch_llm = create_user_agent(agent, batch=True)
+
+        # Each sender has its own conversation, senders are answered in parallel
+        # while messages of one sender keep their order
+        self.workers = KeyedWorkerPool(lambda item: self._process_message(*item), max_workers=Config.USER_MESSAGE_WORKERS)
+
+        # Bursts of messages (e.g. deposits landing in the same blocks) are answered in one run
+        self.batcher = MicroBatcher(self._on_batch, max_size=Config.USER_BATCH_SIZE, max_wait=Config.USER_BATCH_WINDOW)
+        self.in_batch: Dict[str, asyncio.Event] = {}  # sender -> set when their batch is answered
+        # Windows are sorted into batch and per-sender messages one at a time, in order
+        self.batch_lock = asyncio.Lock()
+
+        agent.event_bus.subscribe(EventType.SYSTEM_SHUTDOWN, self._on_shutdown)
+
         logger.info(f"UserMessageHandler initialized")
 
     @property
     def subscribes_to(self):
         return [EventType.USER_MESSAGE]
 
+    @staticmethod
+    def _thread_id(sender: str) -> str:
+        return f"user_{sender.lower()}"
+
+    @staticmethod
+    def _message_text(event: BaseEvent) -> str:
+        # pass in a more detailed message to the agent, to access sender
+        return "TEXT: {text} \n======\n USER_ID: {sender}".format(text=event.data.text, sender=event.data.sender)
+
     async def handle(self, event: BaseEvent):
-        try:
-            # Log the incoming message
-            if isinstance(event.data, ChainMessage):
-                message_data = {
-                    "text": event.data.text,
-                    "sender": event.data.sender,
-                    "tx": event.data.transaction_hash,
-                }
-
-                # Broadcast that we received a message
-                await self.agent.broadcast_activity(MESSAGE_RECEIVED, {
-                    "sender": event.data.sender,
-                    "timestamp": event.timestamp
-                })
+        if not isinstance(event.data, ChainMessage):
+            print("Unknown message type!!!")
+            return
 
-                # Store message in Supabase
-                await SupabaseClient.store_message(message_data)
+        self.batcher.add(event)
 
-                # log the message
-                message_data.update({"from": "user"})
+    async def _on_batch(self, events: List[BaseEvent]):
+        """
+        Answer a window of messages.
 
-                # pass in a more detailed message to the agent, to access sender 
-                message_text = "TEXT: {text} \n======\n USER_ID: {sender}".format(text=event.data.text, sender=event.data.sender)
+        Messages are answered together when their senders have nothing else in flight,
+        wrote once in the window and have no earlier conversation: a batch prompt never
+        carries one sender's history next to other senders' messages. Other messages keep
+        the per-sender path, so each sender's messages are still answered in order.
+        A message the batch did not answer, e.g. the run failed or ran out of budget,
+        is answered alone afterwards.
+        """
+        async with self.batch_lock:
+            senders = [event.data.sender.lower() for event in events]
+            batch = [
+                event for event, sender in zip(events, senders)
+                if senders.count(sender) == 1 and not self.workers.is_pending(sender)
+                and sender not in self.in_batch and not await self._has_history(sender)
+            ]
+            if len(batch) < 2:
+                batch = []
 
-            else:
-                print("Unknown message type!!!")
+            for event, sender in zip(events, senders):
+                if event not in batch:
+                    self.workers.submit(sender, (event, False))
+            if not batch:
                 return
-            
 
-            # Process through the user react graph
-            config = {"configurable": {"thread_id": "user_public_chat"}}
+            done = asyncio.Event()
+            batch_senders = [event.data.sender.lower() for event in batch]
+            for sender in batch_senders:
+                self.in_batch[sender] = done
+
+        received = []
+        replies = {}
+        try:
+            for event in batch:
+                await self._receive(event)
+                received.append(event)
+
+            # One graph run, one answer budget
+            replies = await self.run_within_budget(self._batch_replies(batch), Config.USER_MESSAGE_BUDGET, "user batch", reset=True)
+        except Exception as e:
+            logger.error(f"UserMessageHandler batch: {str(e)}")
+
+        try:
+            await self._deliver_replies(batch, replies, received)
+        finally:
+            for sender in batch_senders:
+                del self.in_batch[sender]
+            done.set()
+
+    async def _has_history(self, sender: str) -> bool:
+        """Whether the sender already has a conversation, assumed on error"""
+        try:
+            state = await self.llm.aget_state({"configurable": {"thread_id": self._thread_id(sender)}})
+            return bool(state.values.get("messages"))
+        except Exception as e:
+            logger.warning(f"UserMessageHandler: could not read the thread of {sender}: {str(e)}")
+            return True
+
+    async def _receive(self, event: BaseEvent):
+        # Broadcast that we received a message
+        await self.agent.broadcast_activity(MESSAGE_RECEIVED, {
+            "sender": event.data.sender,
+            "timestamp": event.timestamp
+        })
+
+        # Store message in Supabase
+        await SupabaseClient.store_message({
+            "text": event.data.text,
+            "sender": event.data.sender,
+            "tx": event.data.transaction_hash,
+        })
 
+    async def _batch_replies(self, events: List[BaseEvent]) -> Dict[int, str]:
+        """One graph run answering every message, replies by message tag"""
+        messages = "\n\n".join(f"[{i}] {self._message_text(event)}" for i, event in enumerate(events, 1))
 
-            state = await self.llm.ainvoke({
+        with tool_memo_scope() as tool_memo:
+            state = await self.batch_llm.ainvoke({
                 "messages": [
-                    HumanMessage(content=message_text)
+                    HumanMessage(content=batch_prompt.format(messages=messages))
                 ]
-            }, config=config)
-            
+            })
+        logger.info(f"User batch of {len(events)} messages, tool memo: {tool_memo.stats()}")
+
+        return _split_replies(_text(state['messages'][-1].content))
+
+    async def _deliver_replies(self, events: List[BaseEvent], replies: Dict[int, str], received: List[BaseEvent]):
+        """Store each batch reply in its sender's thread, messages without one are answered alone"""
+        for i, event in enumerate(events, 1):
+            sender = event.data.sender
+            if i not in replies:
+                # Batch failed, timed out or skipped it: answer it after the batch releases the sender
+                logger.warning(f"No batch reply for message {i} of {sender}, answering it alone")
+                self.workers.submit(sender.lower(), (event, event in received))
+                continue
+
+            try:
+                await SupabaseClient.store_message({
+                    "text": replies[i],
+                    "sender": "agent",
+                    "tx": None,
+                })
+                # Record the exchange in the sender's own thread, as if answered there
+                await self.llm.aupdate_state(
+                    {"configurable": {"thread_id": self._thread_id(sender)}},
+                    {"messages": [HumanMessage(content=self._message_text(event)), AIMessage(content=replies[i])]},
+                    as_node="agent"
+                )
+            except Exception as e:
+                logger.error(f"UserMessageHandler batch reply to {sender}: {str(e)}")
+
+    async def _process_message(self, event: BaseEvent, received: bool = False):
+        # A batch still answering this sender goes first
+        pending_batch = self.in_batch.get(event.data.sender.lower())
+        if pending_batch:
+            await pending_batch.wait()
+
+        # The budget starts with the answer, not while the message waited its turn
+        try:
+            await self.run_within_budget(self._answer(event, received), Config.USER_MESSAGE_BUDGET, "user message", reset=True)
+        except BudgetExceeded:
+            pass
+
+    async def _answer(self, event: BaseEvent, received: bool):
+        try:
+            if not received:
+                await self._receive(event)
+
+            # Process through the user react graph, in the sender's own thread
+            config = {"configurable": {"thread_id": self._thread_id(event.data.sender)}}
+
+            with tool_memo_scope() as tool_memo:
+                state = await self.llm.ainvoke({
+                    "messages": [
+                        HumanMessage(content=self._message_text(event))
+                    ]
+                }, config=config)
+            logger.info(f"User run tool memo: {tool_memo.stats()}")
+
             response = state['messages'][-1].content
 
             await SupabaseClient.store_message({
@@ -71,4 +234,8 @@ class UserMessageHandler(BaseHandler):
             })
 
         except Exception as e:
-            logger.error("UserMessageHandler", str(e))
+            logger.error(f"UserMessageHandler: {str(e)}")
+
+    async def _on_shutdown(self, _):
+        await self.batcher.close()
+        await self.workers.close()
@@ -15,6 +15,8 @@ from web3.contract import Contract
 
 from models.messages import ChainMessage
 from utils.constants import MORPHO_BLUE_ADDRESS, VAULT_ADDRESS
+from utils.dedup import RecentKeys
+from utils.chain_cursor import chain_cursor_store
 
 
 # Get the standard Python logger
@@ -25,6 +27,12 @@ MB_WITHDRAW_TOPIC = "0xa56fc0ad5702ec05ce63666221f796fb62437c32db1aa1aa075fc6484
 MB_BORROW_TOPIC = "0x570954540bed6b1304a87dfe815a5eda4a648f7097a16240dcd85c9b5fd42a43"
 MB_REPAY_TOPIC = "0x52acb05cebbd3cd39715469f22afbf5a17496295ef3bc9bb5944056c63ccaa09"
 
+# Logs remembered per processor to drop duplicates from rescanned block ranges
+SEEN_LOGS_SIZE = 10_000
+
+# Blocks fetched per request, catching up after a downtime goes page by page
+MAX_BLOCK_RANGE = 2_000
+
 # Todo: Change Vault to batch fetch from topic, if we need more events in the future
 # MV_DEPOSIT_TOPIC = "0xdcbc1c05240f31ff3ad067ef1ee35ce4997762752e3a095284754544f4c709d7"
 
@@ -60,6 +68,24 @@ class BaseEventProcessor:
         self.is_running = False
         self.polling_task = None
         self.last_processed_block = 0
+        self.seen_logs = RecentKeys(SEEN_LOGS_SIZE)
+
+        # Where the previous run stopped, logs up to resume_log were already dispatched
+        self.cursor_name = self.__class__.__name__
+        self.resume_block, self.resume_log = chain_cursor_store.load(self.cursor_name)
+
+    def _is_new_log(self, log) -> bool:
+        """False if this (tx_hash, log_index) was already processed, before or since the last restart"""
+        if self.resume_log and (log['blockNumber'], log['logIndex']) <= self.resume_log:
+            return False
+        return self.seen_logs.add((log['transactionHash'].hex(), log['logIndex']))
+
+    async def _mark_processed(self, log):
+        """
+        Store the log as the restart position, once its events were published. A crash
+        before that replays it, stored events are deduplicated on (tx_hash, log_index).
+        """
+        await asyncio.to_thread(chain_cursor_store.save_log, self.cursor_name, log['blockNumber'], log['logIndex'])
 
     async def start(self):
         """Start the processor's polling loop"""
@@ -86,16 +112,22 @@ class BaseEventProcessor:
             try:
                 latest_block = self.web3.eth.block_number
                 
-                # when we restart, scan back 10 blocks
+                # when we restart, resume after the stored block, or scan back 10 blocks the first time
                 if self.last_processed_block == 0:
-                    self.last_processed_block = latest_block - 10
+                    self.last_processed_block = self.resume_block or latest_block - 10
 
                 if latest_block > self.last_processed_block:
+                    to_block = min(latest_block, self.last_processed_block + MAX_BLOCK_RANGE)
                     await self.process_blocks(
                         from_block=self.last_processed_block + 1,
-                        to_block=latest_block
+                        to_block=to_block
                     )
-                    self.last_processed_block = latest_block
+                    self.last_processed_block = to_block
+                    await asyncio.to_thread(chain_cursor_store.save_block, self.cursor_name, to_block)
+
+                    # Still catching up, fetch the next page right away
+                    if to_block < latest_block:
+                        continue
                 
                 await asyncio.sleep(self.polling_interval)
                 
@@ -126,7 +158,7 @@ class OnChainListener(Listener):
         self.processors: Dict[str, BaseEventProcessor] = {}
         
         # Initialize Web3
-        self.web3 = Web3(Web3.HTTPProvider(Config.CHAIN_RPC_URL))
+        self.web3 = Web3(Web3.HTTPProvider(Config.CHAIN_RPC_URL, request_kwargs={"timeout": Config.RPC_TIMEOUT}))
 
         # Initialize contracts
         morpho_blue_contract = self.web3.eth.contract(
@@ -194,6 +226,9 @@ class MorphoBlueProcessor(BaseEventProcessor):
 
         # Process and publish events
         for raw_log in events:
+            if not self._is_new_log(raw_log):
+                continue
+
             # find according ABI for the specific event
             event_abi = get_event_abi_from_topic(morpho_blue_abi, raw_log['topics'][0])
             log = get_event_data(self.web3.codec, event_abi, raw_log)
@@ -213,6 +248,8 @@ class MorphoBlueProcessor(BaseEventProcessor):
             except Exception as e:
                 logger.error("MorphoBlue", str(e))
 
+            await self._mark_processed(raw_log)
+
     def _parse_event(self, log):
         evm_event_type = log.event.lower()  # supply, withdraw, repay, borrow
         parsed = dict(log.args)
@@ -223,6 +260,8 @@ class MorphoBlueProcessor(BaseEventProcessor):
         return {
             'evm_event': evm_event_type,
             'tx_hash': log.transactionHash.hex(),
+            'log_index': log.logIndex,
+            'block_number': log.blockNumber,
             'market_id': market_id,
             'caller': parsed.get('caller', ''),
             'on_behalf': parsed.get('onBehalf', ''),
@@ -244,6 +283,9 @@ class MorphoVaultProcessor(BaseEventProcessor):
         deposit_events = self.contract.events.Deposit().get_logs(from_block=from_block, to_block=to_block)
         
         for log in deposit_events:
+            if not self._is_new_log(log):
+                continue
+
             # parse deposit event and set as "CHAIN_EVENT" event
             try:
                 data = self._parse_event(log)
@@ -258,66 +300,72 @@ class MorphoVaultProcessor(BaseEventProcessor):
                 logger.error(f"[MorphoVault] Event process error: {str(e)}")
 
             # Parse attached bytes as user message
-            try:
-                txhash = log.transactionHash.hex()
-                
-                # Try to get the transaction with retries
-                tx = None
-                retries = 5
-                while retries > 0 and not tx:
-                    try:
-                        tx = self.web3.eth.get_transaction(txhash)
-                    except Exception:
-                        retries -= 1
-                        if retries > 0:  # Only sleep if we're going to retry
-                            await asyncio.sleep(5)
-                
-                if not tx:
-                    print(f"[MorphoVault] No transaction found for {txhash}")
-                    return
-
-                # Extract and decode message
-                input_data = tx['input']
-                if len(input_data) <= 68:  # No message attached
-                    return
-                    
-                # Convert HexBytes to string and remove '0x' prefix
-                if hasattr(input_data, 'hex'):
-                    message_hex = input_data[68:].hex()
-                else:
-                    message_hex = input_data[68:]
-                    if message_hex.startswith('0x'):
-                        message_hex = message_hex[2:]
-                
+            await self._publish_message(log)
+
+            await self._mark_processed(log)
+
+    async def _publish_message(self, log):
+        """Publish the message attached to a deposit transaction, if any"""
+        try:
+            txhash = log.transactionHash.hex()
+
+            # Try to get the transaction with retries
+            tx = None
+            retries = 5
+            while retries > 0 and not tx:
                 try:
-                    # Try to decode as UTF-8 string
-                    message_bytes = bytes.fromhex(message_hex)
-                    message = message_bytes.decode('utf-8').strip()
-                    
-                    if message:  # Only process non-empty messages
-                        logger.info(f"[MorphoVault] Decoded message: {message}")
-                        
-                        data = ChainMessage(
-                            text=message,
-                            sender=tx['from'],
-                            transaction_hash=txhash,
-                            timestamp=time.time()
-                        )
-
-                        # publish user message
-                        event = BaseEvent(
-                            type=EventType.USER_MESSAGE,
-                            data=data,
-                            source="onchain",
-                            timestamp=time.time()
-                        )
-                        await self.event_bus.publish(EventType.USER_MESSAGE, event)
-
-                except (UnicodeDecodeError, ValueError) as e:
-                    logger.error(f"[MorphoVault] Message decode error: {str(e)}")
+                    tx = self.web3.eth.get_transaction(txhash)
+                except Exception:
+                    retries -= 1
+                    if retries > 0:  # Only sleep if we're going to retry
+                        await asyncio.sleep(5)
+
+            if not tx:
+                print(f"[MorphoVault] No transaction found for {txhash}")
+                return
+
+            # Extract and decode message
+            input_data = tx['input']
+            if len(input_data) <= 68:  # No message attached
+                return
+
+            # Convert HexBytes to string and remove '0x' prefix
+            if hasattr(input_data, 'hex'):
+                message_hex = input_data[68:].hex()
+            else:
+                message_hex = input_data[68:]
+                if message_hex.startswith('0x'):
+                    message_hex = message_hex[2:]
 
-            except Exception as e:
-                logger.error(f"[MorphoVault] Error: {str(e)}")
+            try:
+                # Try to decode as UTF-8 string
+                message_bytes = bytes.fromhex(message_hex)
+                message = message_bytes.decode('utf-8').strip()
+
+                if message:  # Only process non-empty messages
+                    logger.info(f"[MorphoVault] Decoded message: {message}")
+
+                    data = ChainMessage(
+                        text=message,
+                        sender=tx['from'],
+                        transaction_hash=txhash,
+                        timestamp=time.time()
+                    )
+
+                    # publish user message
+                    event = BaseEvent(
+                        type=EventType.USER_MESSAGE,
+                        data=data,
+                        source="onchain",
+                        timestamp=time.time()
+                    )
+                    await self.event_bus.publish(EventType.USER_MESSAGE, event)
+
+            except (UnicodeDecodeError, ValueError) as e:
+                logger.error(f"[MorphoVault] Message decode error: {str(e)}")
+
+        except Exception as e:
+            logger.error(f"[MorphoVault] Error: {str(e)}")
 
     def _parse_event(self, log):
         parsed = dict(log.args)
@@ -326,6 +374,8 @@ class MorphoVaultProcessor(BaseEventProcessor):
             'protocol': 'morpho_vault',
             'evm_event': 'deposit',
             'tx_hash': log.transactionHash.hex(),
+            'log_index': log.logIndex,
+            'block_number': log.blockNumber,
             'sender': parsed.get('sender', ''),
             'owner': parsed.get('owner', ''),
             'assets': str(parsed.get('assets', 0)),
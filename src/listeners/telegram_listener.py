@@ -30,10 +30,10 @@ class TelegramListener(Listener):
         print("Telegram bot started successfully!")
 
     async def _setup_handlers(self):
-        """Configure message handlers"""
+        """Configure message handlers, slash commands included (answered by the admin handler)"""
         self.application.add_handler(
             MessageHandler(
-                filters.TEXT & ~filters.COMMAND,
+                filters.TEXT,
                 self._handle_incoming_message
             )
         )
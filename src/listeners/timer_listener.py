@@ -1,59 +1,77 @@
 from core.agent import Listener
+from core.scheduler import Scheduler, IntervalSpec
 from models.events import EventType, BaseEvent
-import asyncio
+from config import Config
 from datetime import datetime
 import logging
 
 logger = logging.getLogger(__name__)
 
+RISK_UPDATE_JOB = "risk_update"
+
 class TimerListener(Listener):
     """Emits periodic events for scheduled tasks"""
-    
-    def __init__(self, event_bus):
+
+    def __init__(self, event_bus, scheduler: Scheduler):
         super().__init__(event_bus)
-        self.is_running = False
-        self.tasks = []
-        self.intervals = {
-            'RISK_UPDATE': 3600  # seconds
-        }
+        self.scheduler = scheduler
+
+        # Adaptive risk scheduling: signals pull the next run earlier, quiet periods push it later
+        self.risk_interval = Config.RISK_INTERVAL
+        self.pending_signals = []
+        self.event_bus.subscribe(EventType.RISK_SIGNAL, self._on_risk_signal)
 
     async def start(self):
         """Start timer-based event emission"""
-        self.is_running = True
-        self.tasks.append(
-            asyncio.create_task(self._emit_risk_events())
+        self.scheduler.add_job(
+            RISK_UPDATE_JOB,
+            self._emit_risk_event,
+            IntervalSpec(self.risk_interval),
+            jitter=Config.RISK_JITTER,
+            min_spacing=Config.RISK_MIN_SPACING,
+            timeout=Config.RISK_RUN_TIMEOUT,
+            run_immediately=True
         )
         logger.info("Timer-based event emission started")
 
     async def stop(self):
         """Stop all timers"""
-        self.is_running = False
-        for task in self.tasks:
-            task.cancel()
-        self.tasks = []
+        self.scheduler.remove_job(RISK_UPDATE_JOB)
         logger.info("Timer-based event emission stopped")
 
-    async def _emit_risk_events(self):
-        """Emit periodic risk update events"""
-        # Add initial delay to prevent immediate trigger
-        # await asyncio.sleep(self.intervals['RISK_UPDATE'])
-        
-        while self.is_running:
-            try:
-                # Create and emit event
-                event = BaseEvent(
-                    type=EventType.RISK_UPDATE,
-                    data={
-                        'type': 'periodic_update'
-                    },
-                    source="timer",
-                    timestamp=datetime.now().timestamp()
-                )
-                
-                await self.event_bus.publish(EventType.RISK_UPDATE, event)
-                
-            except Exception as e:
-                print("TimerListener", f"Error emitting risk event: {str(e)}")
-            
-            # Wait for next interval
-            await asyncio.sleep(self.intervals['RISK_UPDATE'])
\ No newline at end of file
+    async def _on_risk_signal(self, event: BaseEvent):
+        """Collect market signals, and bring the next risk update forward (debounced)"""
+        # Signals seen while paused are dropped, /resume starts from the current markets
+        job = self.scheduler.jobs.get(RISK_UPDATE_JOB)
+        if job is None or job.paused:
+            self.pending_signals = []
+            return
+
+        self.pending_signals.append(event.data)
+        self.scheduler.trigger(RISK_UPDATE_JOB, delay=Config.RISK_SIGNAL_DEBOUNCE)
+
+    async def _emit_risk_event(self):
+        """Emit a risk update event, the scheduler makes sure runs never overlap"""
+        signals = self.pending_signals
+        self.pending_signals = []
+
+        event = BaseEvent(
+            type=EventType.RISK_UPDATE,
+            data={
+                'type': 'signal_triggered' if signals else 'periodic_update',
+                'signals': signals
+            },
+            source="timer",
+            timestamp=datetime.now().timestamp()
+        )
+
+        await self.event_bus.publish(EventType.RISK_UPDATE, event)
+
+        # Back off while markets are quiet (the change gate skipped the run), reset as soon
+        # as something happens. A failed or timed out run is not quiet, it keeps the default interval.
+        quiet = not signals and event.data.get('outcome') == 'skipped'
+        interval = min(self.risk_interval * 2, Config.RISK_MAX_INTERVAL) if quiet else Config.RISK_INTERVAL
+        if interval != self.risk_interval:
+            self.risk_interval = interval
+            self.scheduler.reschedule(RISK_UPDATE_JOB, IntervalSpec(interval))
+            logger.info(f"Next risk update in at most {interval}s")
@@ -6,7 +6,14 @@ from listeners.telegram_listener import TelegramListener
 from listeners.onchain_listener import OnChainListener
 from listeners.timer_listener import TimerListener
 from handlers import AdminMessageHandler, UserMessageHandler, BaseChainEventHandler, PeriodicRiskHandler
+from core.scheduler import IntervalSpec
 from utils.supabase import SupabaseClient
+from utils.checkpointer import prune_checkpoints, close_checkpointer
+from utils.llm_cache import llm_cache_store
+from utils.llm_gateway import gateway_metrics
+from utils.snapshots import refresh_market_snapshots
+from utils.flow_rollup import flow_rollup
+from config import Config
 from utils.websocket import WebSocketManager
 import logging
 
@@ -24,6 +31,14 @@ async def healthcheck(request):
     """Simple healthcheck endpoint"""
     return web.Response(text="OK")
 
+async def metrics(request):
+    """Outbox depth and ship latency, LLM cache hit rates, LLM gateway load per model"""
+    return web.json_response({
+        "outbox": SupabaseClient.buffer_metrics(),
+        "llm_cache": llm_cache_store.metrics(),
+        "llm_gateway": gateway_metrics()
+    })
+
 async def websocket_handler(request):
     """Handle WebSocket connections"""
     # Get the WebSocket manager before any potential exceptions occur
@@ -70,6 +85,7 @@ async def init_app():
     # Add routes
     app.router.add_get('/', healthcheck)
     app.router.add_get('/health', healthcheck)
+    app.router.add_get('/metrics', metrics)
     app.router.add_get('/ws', websocket_handler)
     
     return app
@@ -93,7 +109,7 @@ async def main():
     
     try:
         # Initialize Supabase client
-        SupabaseClient.init()
+        await SupabaseClient.init()
 
         # Start web server and get WebSocket manager
         port = int(os.getenv("PORT", "8000"))
@@ -107,23 +123,42 @@ async def main():
         listeners = [
             TelegramListener(agent.event_bus),
             OnChainListener(agent.event_bus),
-            TimerListener(agent.event_bus)
+            TimerListener(agent.event_bus, agent.scheduler)
         ]
         
+        chain_handler = BaseChainEventHandler(agent)
         handlers = [
             AdminMessageHandler(agent),
             UserMessageHandler(agent),
-            BaseChainEventHandler(agent),
+            chain_handler,
             PeriodicRiskHandler(agent)
         ]
 
+        # Keep the conversation checkpoints bounded
+        agent.scheduler.add_job("prune_checkpoints", prune_checkpoints, IntervalSpec(3600), jitter=60)
+
+        # Snapshots answering the admin slash commands
+        agent.scheduler.add_job(
+            "refresh_snapshots",
+            refresh_market_snapshots,
+            IntervalSpec(Config.SNAPSHOT_INTERVAL),
+            timeout=Config.SNAPSHOT_INTERVAL,
+            run_immediately=True
+        )
+
+        # Load the flow window from the DB once, before CHAIN_EVENTs start to update it
+        await flow_rollup.warm()
+
+        # The chain handler drops events until it knows the tracked markets
+        await chain_handler.refresh_tracked_markets()
+
+        # Start agent, its scheduler runs the jobs the listeners register
+        await agent.start()
+
         # Start listeners
         for listener in listeners:
             await listener.start()
         
-        # Start agent
-        await agent.start()
-        
         # Keep main loop running
         while agent.running:
             await asyncio.sleep(1)
@@ -151,7 +186,11 @@ async def main():
             logger.info("Closing WebSocket connections...")
             await ws_manager.close_all_connections()
         
-        # 4. Cleanup web server with timeout to prevent hanging
+        # 4. Flush pending writes and close database connections
+        await SupabaseClient.close()
+        await close_checkpointer()
+
+        # 5. Cleanup web server with timeout to prevent hanging
         if runner:
             logger.info("Stopping web server...")
             try:
@@ -11,6 +11,7 @@ class EventType(Enum):
     SYSTEM_START = "system_start"
     SYSTEM_SHUTDOWN = "system_shutdown"
     RISK_UPDATE = "risk_update"  # New event type for periodic risk updates
+    RISK_SIGNAL = "risk_signal"  # Market condition that may need an early risk update
 
 @dataclass
 class BaseEvent:
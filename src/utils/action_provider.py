@@ -14,17 +14,24 @@ from pydantic import BaseModel, Field
 from utils.market_api import MorphoAPIClient
 from utils.market_onchain import MarketReader
 from utils.market_api import MarketParams
+from utils.simulation import ReallocationSimulator, withdrawal_amounts
+from utils.tool_memo import invalidate_tool_memo
+from utils.llm_cache import invalidate_llm_cache
+from utils.snapshots import snapshots, LAST_REALLOCATION
+from config import Config
 
 VAULT_ADDRESS = "0x346AAC1E83239dB6a6cb760e95E13258AD3d1A6d"
 MAX_UINT256 = 2**256 - 1
 
-web3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL")))
+web3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL"), request_kwargs={"timeout": Config.RPC_TIMEOUT}))
 market_reader = MarketReader(web3)
 
 # import ABI from src/abi/morpho-vault.json
 with open(Path(__file__).parent.parent / "abi" / "morpho-vault.json") as f:
     METAMORPHO_ABI = json.load(f)
 
+simulator = ReallocationSimulator(web3, VAULT_ADDRESS, METAMORPHO_ABI, market_reader)
+
 class MorphoAssetMovement(BaseModel):
     """Input schema for Morpho Vault asset movement."""
     from_market_id: str = Field(..., description="The ID of the market to move assets from")
@@ -181,7 +188,16 @@ reallocations: [
             calldata = encode_reallocation(allocations_for_encoding)
 
             print("calldata", calldata.hex())
-            
+
+            # Dry-run against the pending block, so a bad allocation fails fast instead of on-chain
+            revert = simulator.simulate(
+                wallet_provider.get_address(),
+                calldata,
+                withdrawals=withdrawal_amounts(market_delta)
+            )
+            if revert:
+                return 'Reallocation simulation failed, transaction not sent: ' + revert.describe() + '\n' + revert.model_dump_json(exclude={"raw"})
+
             # Send via multicall
             params = {
                 "to": VAULT_ADDRESS,
@@ -191,6 +207,10 @@ reallocations: [
             tx_hash = wallet_provider.send_transaction(params)
             wallet_provider.wait_for_transaction_receipt(tx_hash)
 
+            # Market data fetched earlier in this run and cached answers are stale now
+            invalidate_tool_memo()
+            invalidate_llm_cache()
+            snapshots.record(LAST_REALLOCATION, tx_hash)
             
             # return the tx hash if success
             return tx_hash
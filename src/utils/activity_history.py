@@ -0,0 +1,91 @@
+""" Incremental, deduplicated storage of agent message histories """
+
+from typing import Dict, List, Optional, Tuple
+import base64
+import hashlib
+import json
+import zlib
+
+from .dedup import RecentKeys
+
+HISTORY_ENCODING = "delta-v1"
+BLOB_ENCODING = "zlib+base64"
+BLOB_MIN_SIZE = 1024  # message contents from this size are stored once, compressed, by hash
+
+def _message_key(message) -> str:
+    """Stable id of a message, LangGraph assigns one to every message of a thread"""
+    if getattr(message, 'id', None):
+        return message.id
+    raw = json.dumps([message.__class__.__name__, message.content], sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+def compress(content) -> Tuple[str, str]:
+    """Return (hash, compressed data) of a message content"""
+    raw = json.dumps(content, sort_keys=True, default=str).encode()
+    return hashlib.sha256(raw).hexdigest(), base64.b64encode(zlib.compress(raw)).decode()
+
+def decompress(data: str):
+    return json.loads(zlib.decompress(base64.b64decode(data)))
+
+class ActivityHistoryEncoder:
+    """
+    Encodes the messages of an activity relative to the previous activity of the same thread.
+
+    Threads are persisted by the checkpointer, so each run sees the whole conversation again.
+    Only messages not stored by an earlier activity are kept, and each activity points to the
+    previous one of its thread (`parent_activity_id`) so the full history can be rebuilt.
+    Runs without a checkpointed thread (`thread_id` None) are stored whole, with no parent.
+    Large contents, typically repeated tool outputs, are stored once as compressed blobs.
+    """
+
+    def __init__(self, max_messages: int = 10_000, max_blobs: int = 50_000):
+        self.max_messages = max_messages
+        self.stored_messages: Dict[str, RecentKeys] = {}  # thread_id -> stored message keys
+        self.last_activity: Dict[str, str] = {}  # thread_id -> last activity id
+        self.stored_blobs = RecentKeys(max_blobs)
+
+    def encode(self, activity_id: str, thread_id: Optional[str], messages: list) -> Tuple[List[Dict], List[Dict], Optional[str]]:
+        """Return (new message entries, new blobs, parent activity id)"""
+        if thread_id is None:
+            stored = RecentKeys(self.max_messages)
+        else:
+            stored = self.stored_messages.setdefault(thread_id, RecentKeys(self.max_messages))
+
+        entries, blobs = [], []
+        for message in messages:
+            key = _message_key(message)
+            if not stored.add(key):
+                continue
+
+            entry = {
+                "id": key,
+                "type": message.__class__.__name__,
+                "additional_kwargs": message.additional_kwargs
+            }
+
+            if len(json.dumps(message.content, default=str)) < BLOB_MIN_SIZE:
+                entry["content"] = message.content
+            else:
+                content_hash, data = compress(message.content)
+                entry["content_ref"] = content_hash
+                if self.stored_blobs.add(content_hash):
+                    blobs.append({"hash": content_hash, "encoding": BLOB_ENCODING, "data": data})
+
+            entries.append(entry)
+
+        if thread_id is None:
+            return entries, blobs, None
+
+        parent_activity_id = self.last_activity.get(thread_id)
+        self.last_activity[thread_id] = activity_id
+        return entries, blobs, parent_activity_id
+
+def decode_entries(entries: List[Dict], blobs: Dict[str, str]) -> List[Dict]:
+    """Resolve blob references, `blobs` maps hash -> compressed data"""
+    decoded = []
+    for entry in entries:
+        entry = dict(entry)
+        if "content_ref" in entry:
+            entry["content"] = decompress(blobs[entry.pop("content_ref")])
+        decoded.append(entry)
+    return decoded
@@ -8,6 +8,7 @@ AGENT_STOPPING = "agent_stopping"
 # Message handling activities
 MESSAGE_RECEIVED = "message_received"
 MESSAGE_RESPONDING = "message_responding"
+HANDLER_TIMEOUT = "handler_timeout"  # a handler ran out of budget, its work was cancelled
 # Onchain activities (Morpho Blue)
 MB_DEPOSIT_DETECTED = "morpho_blue_deposit_detected"
 MB_WITHDRAWAL_DETECTED = "morpho_blue_withdrawal_detected"
@@ -21,6 +22,7 @@ MV_WITHDRAWAL_DETECTED = "morpho_vault_withdrawal_detected"
 # Periodic activities
 PERIODIC_ANALYSIS_STARTED = "periodic_analysis_started"
 PERIODIC_ANALYSIS_COMPLETED = "periodic_analysis_completed"
+PERIODIC_ANALYSIS_SKIPPED = "periodic_analysis_skipped"
 
 # Submiting transactions 
 TX_REALLOCATION = "tx_reallocation"
@@ -32,6 +34,7 @@ VAULT_DATA_FETCHED = "vault_data_fetched"
 
 # Add reasoning activity types
 REASONING_STARTED = "reasoning_started"
+REASONING_DELTA = "reasoning_delta"
 REASONING_COMPLETED = "reasoning_completed"
 
 
@@ -0,0 +1,66 @@
+""" Position of each chain event processor, kept on disk across restarts """
+
+from typing import Optional, Tuple
+import os
+import sqlite3
+import threading
+
+from config import Config
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chain_cursor (
+    name TEXT PRIMARY KEY,
+    processed_block INTEGER,
+    log_block INTEGER,
+    log_index INTEGER
+);
+"""
+
+class ChainCursorStore:
+    """
+    Per processor: the last block range end that was fully processed, and the last
+    log dispatched. A restart resumes after the former and skips logs up to the latter,
+    so the rescanned blocks do not reach the handlers a second time.
+    """
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+
+    def load(self, name: str) -> Tuple[Optional[int], Optional[Tuple[int, int]]]:
+        """Last processed block and last (block, log_index) dispatched, None when unknown"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT processed_block, log_block, log_index FROM chain_cursor WHERE name = ?",
+                (name,)
+            ).fetchone()
+        if not row:
+            return None, None
+        processed_block, log_block, log_index = row
+        return processed_block, (log_block, log_index) if log_block is not None else None
+
+    def save_block(self, name: str, block: int):
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO chain_cursor (name, processed_block) VALUES (?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET processed_block = excluded.processed_block",
+                (name, block)
+            )
+            self.db.commit()
+
+    def save_log(self, name: str, block: int, log_index: int):
+        with self.lock:
+            self.db.execute(
+                "INSERT INTO chain_cursor (name, log_block, log_index) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET log_block = excluded.log_block, log_index = excluded.log_index",
+                (name, block, log_index)
+            )
+            self.db.commit()
+
+chain_cursor_store = ChainCursorStore(Config.CHAIN_CURSOR_PATH)
+
+__all__ = ['ChainCursorStore', 'chain_cursor_store']
@@ -0,0 +1,102 @@
+""" Decide whether market conditions changed enough to run the risk agent """
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from config import Config
+from .market import MarketSnapshot
+
+@dataclass
+class GateThresholds:
+    utilization_delta: float = Config.RISK_GATE_UTILIZATION_DELTA
+    apy_delta: float = Config.RISK_GATE_APY_DELTA
+    net_flow_ratio: float = Config.RISK_GATE_NET_FLOW_RATIO
+    allocation_drift: float = Config.RISK_GATE_ALLOCATION_DRIFT
+    max_skips: int = Config.RISK_GATE_MAX_SKIPS
+
+@dataclass
+class AnalyzedState:
+    """What the market looked like the last time the risk agent ran"""
+    markets: Dict[str, MarketSnapshot] = field(default_factory=dict)
+    allocations: Dict[str, float] = field(default_factory=dict)  # market_id -> share of vault assets
+
+def _utilization(market: MarketSnapshot) -> float:
+    return market['total_borrow'] / market['total_supply'] if market['total_supply'] else 0.0
+
+def _apy_spread(markets: Dict[str, MarketSnapshot]) -> float:
+    apys = [m['supply_apy'] for m in markets.values() if m['supply_apy'] is not None]
+    return max(apys) - min(apys) if apys else 0.0
+
+def allocation_shares(allocations: Dict[str, int]) -> Dict[str, float]:
+    """Convert vault supply per market into a share of the vault assets"""
+    total = sum(allocations.values())
+    if not total:
+        return {}
+    return {market_id: amount / total for market_id, amount in allocations.items()}
+
+class ChangeDetector:
+    """Compares the current market history with the last analyzed one"""
+
+    def __init__(self, thresholds: GateThresholds = None):
+        self.thresholds = thresholds or GateThresholds()
+        self.last_analyzed: Optional[AnalyzedState] = None
+        self.skipped_runs = 0
+
+    def material_changes(self, market_history: List[MarketSnapshot], allocations: Dict[str, int]) -> List[str]:
+        """Return the reasons to run the analysis, empty if nothing material changed"""
+        if self.last_analyzed is None:
+            return ["first run"]
+
+        if self.skipped_runs >= self.thresholds.max_skips:
+            return [f"{self.skipped_runs} runs skipped in a row"]
+
+        t = self.thresholds
+        reasons = []
+        current = {m['id']: m for m in market_history}
+        previous = self.last_analyzed.markets
+
+        for market_id, market in current.items():
+            # Net flows over the window, relative to market size
+            if market['total_supply']:
+                for flow in ('net_supply', 'net_borrow'):
+                    ratio = abs(market[flow]) / market['total_supply']
+                    if ratio >= t.net_flow_ratio:
+                        reasons.append(f"{market_id}: {flow} {ratio * 100:.1f}% of supply")
+
+            last = previous.get(market_id)
+            if last is None:
+                continue
+
+            utilization_delta = abs(_utilization(market) - _utilization(last))
+            if utilization_delta >= t.utilization_delta:
+                reasons.append(f"{market_id}: utilization moved {utilization_delta * 100:.1f}pt")
+
+            if market['supply_apy'] is None or last['supply_apy'] is None:
+                continue
+
+            apy_delta = abs(market['supply_apy'] - last['supply_apy'])
+            if apy_delta >= t.apy_delta:
+                reasons.append(f"{market_id}: supply APY moved {apy_delta:.2f}pt")
+
+        spread_delta = abs(_apy_spread(current) - _apy_spread(previous)) if current and previous else 0.0
+        if spread_delta >= t.apy_delta:
+            reasons.append(f"APY spread moved {spread_delta:.2f}pt")
+
+        shares = allocation_shares(allocations)
+        for market_id in set(shares) | set(self.last_analyzed.allocations):
+            drift = abs(shares.get(market_id, 0.0) - self.last_analyzed.allocations.get(market_id, 0.0))
+            if drift >= t.allocation_drift:
+                reasons.append(f"{market_id}: allocation drifted {drift * 100:.1f}%")
+
+        return reasons
+
+    def mark_analyzed(self, market_history: List[MarketSnapshot], allocations: Dict[str, int]):
+        """Remember the state the risk agent just analyzed"""
+        previous = self.last_analyzed.markets if self.last_analyzed else {}
+        # Keep markets without recent flows so the next comparison still has a baseline
+        markets = {**previous, **{m['id']: m for m in market_history}}
+        self.last_analyzed = AnalyzedState(markets=markets, allocations=allocation_shares(allocations))
+        self.skipped_runs = 0
+
+    def mark_skipped(self):
+        self.skipped_runs += 1
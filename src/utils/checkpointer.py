@@ -0,0 +1,71 @@
+""" Persistent LangGraph checkpointer shared by the conversational graphs """
+
+from typing import Optional
+import logging
+import os
+
+import aiosqlite
+from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+_checkpointer: Optional[AsyncSqliteSaver] = None
+
+def get_checkpointer() -> AsyncSqliteSaver:
+    """
+    SQLite checkpointer, conversations survive restarts.
+    Must be first called from the event loop, the connection is opened on first use.
+    """
+    global _checkpointer
+    if _checkpointer is None:
+        if os.path.dirname(Config.CHECKPOINT_PATH):
+            os.makedirs(os.path.dirname(Config.CHECKPOINT_PATH), exist_ok=True)
+        _checkpointer = AsyncSqliteSaver(aiosqlite.connect(Config.CHECKPOINT_PATH))
+    return _checkpointer
+
+async def prune_checkpoints(keep: int = Config.CHECKPOINT_KEEP):
+    """Delete all but the latest `keep` checkpoints of every thread"""
+    if _checkpointer is None:
+        return
+
+    await _checkpointer.setup()
+    conn = _checkpointer.conn
+
+    # Checkpoint ids are uuid6, they sort by creation time
+    async with _checkpointer.lock:
+        cursor = await conn.execute(
+            """
+            DELETE FROM checkpoints WHERE checkpoint_id NOT IN (
+                SELECT checkpoint_id FROM (
+                    SELECT checkpoint_id, ROW_NUMBER() OVER (
+                        PARTITION BY thread_id, checkpoint_ns ORDER BY checkpoint_id DESC
+                    ) AS rank
+                    FROM checkpoints
+                ) WHERE rank <= ?
+            )
+            """,
+            (keep,)
+        )
+        deleted = cursor.rowcount
+        await conn.execute(
+            """
+            DELETE FROM writes WHERE NOT EXISTS (
+                SELECT 1 FROM checkpoints c
+                WHERE c.thread_id = writes.thread_id
+                  AND c.checkpoint_ns = writes.checkpoint_ns
+                  AND c.checkpoint_id = writes.checkpoint_id
+            )
+            """
+        )
+        await conn.commit()
+
+    if deleted:
+        logger.info(f"Pruned {deleted} old checkpoints")
+
+async def close_checkpointer():
+    global _checkpointer
+    if _checkpointer is not None and _checkpointer.conn.is_alive():
+        await _checkpointer.conn.close()
+    _checkpointer = None
@@ -6,6 +6,9 @@ MORPHO_BLUE_ADDRESS = "0xBBBBBbbBBb9cC5e90e3b3Af64bdAF62C37EEFFCb"
 VAULT_ADDRESS = "0x346AAC1E83239dB6a6cb760e95E13258AD3d1A6d"
 USDC_ADDRESS = "0x833589fCD6eDb6E08f4c7C32D4f71b54bdA02913"  # USDC on Base
 
+# Morpho Blue events below this amount (10 USDC) are ignored
+MIN_EVENT_ASSETS = 10_000000
+
 # GraphQL Queries
 MARKET_APY_QUERY = """
 query getMarketAPY($uniqueKey: String!) {
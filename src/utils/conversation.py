@@ -0,0 +1,81 @@
+""" Token-budgeted conversation window for the checkpointed graphs """
+
+from typing import List
+import logging
+
+from langchain_core.messages import AnyMessage, HumanMessage, RemoveMessage, SystemMessage
+
+from config import Config
+from .model_util import get_llm
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "[Summary of the earlier conversation]"
+
+summary_prompt = """You compress a conversation between a Morpho vault manager agent and its users.
+Write a concise summary of the conversation below: keep the facts, decisions, instructions,
+pending requests and who asked what. Drop small talk and intermediate tool outputs."""
+
+def estimate_tokens(messages: List[AnyMessage]) -> int:
+    """Rough token count, about 4 characters per token"""
+    chars = 0
+    for message in messages:
+        chars += len(str(message.content))
+        chars += len(str(getattr(message, 'tool_calls', None) or ''))
+    return chars // 4
+
+def _transcript(messages: List[AnyMessage]) -> str:
+    return "\n".join(f"{message.__class__.__name__}: {message.content}" for message in messages)
+
+def create_history_window(
+    max_tokens: int = Config.CONVERSATION_MAX_TOKENS,
+    keep_tokens: int = Config.CONVERSATION_KEEP_TOKENS,
+    priority: str = "user"
+):
+    """
+    Build a `pre_model_hook` keeping a thread under `max_tokens`.
+
+    When the history grows past the budget, the most recent turns (about `keep_tokens`)
+    are kept and everything before them is rolled into a single summary message. The
+    thread state itself is rewritten, so checkpoints stay small as well. Summaries go
+    through the LLM gateway with the `priority` of the graph.
+    """
+    summarizer = get_llm(Config.MODEL_TYPE, is_interpreter=True, priority=priority)
+
+    async def trim_history(state) -> dict:
+        messages = state["messages"]
+        if estimate_tokens(messages) <= max_tokens:
+            return {}
+
+        # Keep the latest turns that fit in keep_tokens (at least the current one), starting
+        # at a human message so tool calls and their results are never split
+        human_indexes = [i for i, message in enumerate(messages) if isinstance(message, HumanMessage)]
+        split = human_indexes[-1] if human_indexes else 0
+        kept_tokens = 0
+        for i in range(len(messages) - 1, 0, -1):
+            kept_tokens += estimate_tokens([messages[i]])
+            if kept_tokens > keep_tokens:
+                break
+            if isinstance(messages[i], HumanMessage):
+                split = i
+
+        # Only the current turn in the thread, nothing to roll up
+        if split == 0:
+            return {}
+
+        older = messages[:split]
+        summary = await summarizer.ainvoke([
+            SystemMessage(content=summary_prompt),
+            HumanMessage(content=_transcript(older))
+        ])
+        logger.info(f"Rolled {len(older)} messages into a summary")
+
+        # Reusing the first message id puts the summary in its place
+        return {
+            "messages": [
+                HumanMessage(content=f"{SUMMARY_PREFIX}\n{summary.content}", id=older[0].id),
+                *[RemoveMessage(id=message.id) for message in older[1:]]
+            ]
+        }
+
+    return trim_history
@@ -0,0 +1,77 @@
+""" Deadlines propagated from an event down to the graph, tool and I/O calls serving it """
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Awaitable, Optional
+import asyncio
+import inspect
+import time
+
+# Inner calls get a little more than the time left, so the event budget itself
+# expires first and cancels the whole run (see BaseHandler)
+DEADLINE_GRACE = 1.0  # seconds
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """A call ran past its own timeout or the deadline of the event it serves"""
+
+@contextmanager
+def deadline_scope(seconds: Optional[float], reset: bool = False):
+    """
+    Set the deadline `seconds` from now for the code in this block, and the tasks it starts.
+
+    A nested scope can only shorten the enclosing deadline, unless `reset` is set
+    (e.g. a worker starting on a new item).
+    """
+    deadline = time.time() + seconds if seconds is not None else None
+    current = _deadline.get()
+    if current is not None and not reset:
+        deadline = current if deadline is None else min(deadline, current)
+
+    token = _deadline.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _deadline.reset(token)
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, None without deadline"""
+    deadline = _deadline.get()
+    return deadline - time.time() if deadline is not None else None
+
+def bounded_timeout(cap: Optional[float] = None) -> Optional[float]:
+    """Timeout for an inner call: `cap`, shortened to the time left before the deadline"""
+    left = remaining()
+    if left is None:
+        return cap
+    left = max(left + DEADLINE_GRACE, 0.0)
+    return left if cap is None else min(cap, left)
+
+async def with_deadline(awaitable: Awaitable, cap: Optional[float] = None, what: str = "call"):
+    """Await with a bounded timeout, the awaited work is cancelled when it runs out"""
+    timeout = bounded_timeout(cap)
+    if timeout is not None and timeout <= 0:
+        if inspect.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(f"{what}: deadline already passed")
+
+    try:
+        return await asyncio.wait_for(awaitable, timeout=timeout)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded(f"{what} timed out after {timeout:.1f}s")
+
+def time_bounded(cap: float):
+    """Bound an async tool, a timeout is returned to the agent as an error instead of failing the run"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(**kwargs):
+            try:
+                return await with_deadline(func(**kwargs), cap=cap, what=func.__name__)
+            except DeadlineExceeded as e:
+                return f"Error: {str(e)}"
+        return wrapper
+    return decorator
+
+__all__ = ['DeadlineExceeded', 'deadline_scope', 'remaining', 'bounded_timeout', 'with_deadline', 'time_bounded']
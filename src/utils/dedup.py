@@ -0,0 +1,31 @@
+""" Bounded set of recently seen keys """
+
+from collections import OrderedDict
+from typing import Hashable
+
+class RecentKeys:
+    """
+    Remembers the last `maxsize` keys, least recently seen are forgotten first.
+    Used to drop duplicate logs when block ranges are scanned more than once.
+    """
+
+    def __init__(self, maxsize: int = 10_000):
+        self.maxsize = maxsize
+        self.keys: OrderedDict = OrderedDict()
+
+    def add(self, key: Hashable) -> bool:
+        """Remember a key, returns False if it was already seen"""
+        if key in self.keys:
+            self.keys.move_to_end(key)
+            return False
+
+        self.keys[key] = None
+        if len(self.keys) > self.maxsize:
+            self.keys.popitem(last=False)
+        return True
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.keys
+
+    def __len__(self) -> int:
+        return len(self.keys)
@@ -0,0 +1,155 @@
+""" In-memory rolling window of per-minute market flows """
+
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+import logging
+import time
+
+from .supabase import SupabaseClient
+
+logger = logging.getLogger(__name__)
+
+FLOW_EVENTS = ('supply', 'withdraw', 'borrow', 'repay')
+BUCKET_SECONDS = 60
+RETENTION = timedelta(days=7)
+
+def _bucket_of(timestamp: float) -> int:
+    return int(timestamp // BUCKET_SECONDS) * BUCKET_SECONDS
+
+class _MarketRing:
+    """Ring buffer of per-minute flow sums for one market"""
+
+    def __init__(self, size: int):
+        self.size = size
+        self.starts = [None] * size  # bucket start held by each slot
+        self.amounts = [None] * size  # event -> amount
+
+    def _slot(self, bucket_start: int) -> dict:
+        index = (bucket_start // BUCKET_SECONDS) % self.size
+        # Slot still holds an older bucket: overwrite it
+        if self.starts[index] != bucket_start:
+            self.starts[index] = bucket_start
+            self.amounts[index] = dict.fromkeys(FLOW_EVENTS, 0)
+        return self.amounts[index]
+
+    def add(self, bucket_start: int, event: str, amount: int):
+        self._slot(bucket_start)[event] += amount
+
+    def set(self, bucket_start: int, amounts: Dict[str, int]):
+        self._slot(bucket_start).update(amounts)
+
+    def totals(self, start_bucket: int, end_bucket: int) -> Dict[str, int]:
+        totals = dict.fromkeys(FLOW_EVENTS, 0)
+        first = max(start_bucket, end_bucket - (self.size - 1) * BUCKET_SECONDS)
+        for bucket_start in range(first, end_bucket + 1, BUCKET_SECONDS):
+            index = (bucket_start // BUCKET_SECONDS) % self.size
+            if self.starts[index] == bucket_start:
+                for event in FLOW_EVENTS:
+                    totals[event] += self.amounts[index][event]
+        return totals
+
+class FlowRollup:
+    """
+    Per-market, per-minute supply/withdraw/borrow/repay sums over a rolling window.
+
+    Fed by BaseChainEventHandler with the events it stores and warmed from the
+    `market-flow-rollups` table at startup, before the chain listeners start. Until
+    it is warmed, `covers()` is False and callers fall back to the database.
+    """
+
+    def __init__(self, retention: timedelta = RETENTION):
+        self.retention = retention
+        self.size = int(retention.total_seconds() // BUCKET_SECONDS)
+        self.rings: Dict[str, _MarketRing] = {}
+        # Totals are complete from this time on (None until warmed)
+        self.complete_since: Optional[float] = None
+        # Events up to this block are already in the warmed buckets
+        self.warm_block: Optional[int] = None
+
+    def _ring(self, market_id: str) -> _MarketRing:
+        if market_id not in self.rings:
+            self.rings[market_id] = _MarketRing(self.size)
+        return self.rings[market_id]
+
+    def record(
+        self,
+        market_id: str,
+        event: str,
+        amount: int,
+        timestamp: Optional[float] = None,
+        block_number: Optional[int] = None
+    ):
+        """Add one event to its minute bucket"""
+        if event not in FLOW_EVENTS or not amount:
+            return
+        # Rescanned after a restart, the warmed buckets already count it
+        if self.warm_block is not None and block_number is not None and block_number <= self.warm_block:
+            return
+
+        bucket_start = _bucket_of(timestamp or time.time())
+        # Too old for the window, it would overwrite a recent slot
+        if bucket_start <= time.time() - self.retention.total_seconds():
+            return
+        self._ring(market_id).add(bucket_start, event, amount)
+
+    def covers(self, start: float) -> bool:
+        """Whether the window holds every event since `start`"""
+        if self.complete_since is None:
+            return False
+        oldest = time.time() - self.retention.total_seconds() + BUCKET_SECONDS
+        return start >= max(self.complete_since, oldest)
+
+    def totals(self, start: float, end: Optional[float] = None) -> List[dict]:
+        """Per-market totals over [start, end], same shape as get_market_operations"""
+        start_bucket = _bucket_of(start)
+        end_bucket = _bucket_of(end or time.time())
+
+        results = []
+        for market_id, ring in self.rings.items():
+            totals = ring.totals(start_bucket, end_bucket)
+            if any(totals.values()):
+                results.append({'id': market_id, **totals})
+
+        return results
+
+    def net_flows(self, market_id: str, minutes: int) -> Dict[str, int]:
+        """Net supply and borrow of a market over the last N minutes"""
+        ring = self.rings.get(market_id)
+        if not ring:
+            return {'net_supply': 0, 'net_borrow': 0}
+
+        now = time.time()
+        totals = ring.totals(_bucket_of(now - minutes * 60), _bucket_of(now))
+        return {
+            'net_supply': totals['supply'] - totals['withdraw'],
+            'net_borrow': totals['borrow'] - totals['repay']
+        }
+
+    async def warm(self):
+        """
+        Load the retention window from the rollup table.
+
+        Run it before the chain listeners start: buckets are overwritten with the table's
+        sums, and events up to the last stored block are skipped afterwards.
+        """
+        start = datetime.now(timezone.utc) - self.retention
+        # Events still in the outbox would be missing from the table
+        await SupabaseClient.flush()
+        warm_block = await SupabaseClient.get_latest_event_block()
+        rows = await SupabaseClient.get_flow_rollup_buckets(start)
+        if rows is None:
+            logger.warning("Flow rollup not warmed, window queries will use the database")
+            return
+
+        # The table is the source of truth up to warm_block
+        for row in rows:
+            bucket_start = _bucket_of(datetime.fromisoformat(row['bucket']).timestamp())
+            self._ring(row['market']).set(bucket_start, {event: int(row[event]) for event in FLOW_EVENTS})
+
+        self.complete_since = start.timestamp()
+        self.warm_block = warm_block
+        logger.info(f"Flow rollup warmed with {len(rows)} buckets, up to block {warm_block}")
+
+flow_rollup = FlowRollup()
+
+__all__ = ['FlowRollup', 'flow_rollup', 'FLOW_EVENTS']
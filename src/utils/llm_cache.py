@@ -0,0 +1,147 @@
+""" SQLite-backed LLM response cache, exact prompt matches """
+
+from typing import Any, Dict, Optional
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from langchain_core.caches import BaseCache, RETURN_VAL_TYPE
+from langchain_core.load import dumps, loads
+
+from config import Config
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS llm_cache (
+    key TEXT PRIMARY KEY,
+    state_version INTEGER NOT NULL,
+    response TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+"""
+
+def _hash(*parts: str) -> str:
+    return hashlib.sha256("\x1f".join(parts).encode()).hexdigest()
+
+class LLMCacheStore:
+    """
+    Local SQLite store shared by the response caches.
+
+    Every key includes the current vault state version: `invalidate()` bumps it when
+    the vault state changes, so entries computed on the old state are never served.
+    """
+
+    def __init__(self, path: str):
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        # Entries are disposable: a file from the semantic version (embedding column) is recreated
+        columns = [row[1] for row in self.db.execute("PRAGMA table_info(llm_cache)")]
+        if "embedding" in columns:
+            self.db.execute("DROP TABLE llm_cache")
+        self.db.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.state_version = int(time.time())
+
+        # Metrics
+        self.exact_hits = 0
+        self.misses = 0
+
+    def key(self, *parts: str) -> str:
+        """Exact key of a prompt on the current vault state"""
+        return _hash(*parts, str(self.state_version))
+
+    def get_text(self, key: str) -> Optional[str]:
+        """Cached completion text, for callers that stream and bypass the LangChain cache"""
+        text = self.get(key)
+        if text is None:
+            self.misses += 1
+        else:
+            self.exact_hits += 1
+        return text
+
+    def put_text(self, key: str, text: str, ttl: float):
+        self.put(key, text, ttl)
+
+    def get(self, key: str) -> Optional[str]:
+        with self.lock:
+            row = self.db.execute(
+                "SELECT response FROM llm_cache WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, response: str, ttl: float):
+        now = time.time()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, state_version, response, created_at, expires_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, self.state_version, response, now, now + ttl)
+            )
+            self.db.commit()
+
+    def invalidate(self):
+        """The vault state changed, drop every entry computed on the previous one"""
+        with self.lock:
+            self.state_version += 1
+            self.db.execute("DELETE FROM llm_cache WHERE state_version < ? OR expires_at <= ?", (self.state_version, time.time()))
+            self.db.commit()
+        logger.info("LLM cache invalidated")
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM llm_cache")
+            self.db.commit()
+
+    def metrics(self) -> Dict[str, Any]:
+        lookups = self.exact_hits + self.misses
+        with self.lock:
+            size = self.db.execute("SELECT COUNT(*) FROM llm_cache").fetchone()[0]
+        return {
+            "entries": size,
+            "exact_hits": self.exact_hits,
+            "misses": self.misses,
+            "hit_rate": self.exact_hits / lookups if lookups else 0.0
+        }
+
+class LLMResponseCache(BaseCache):
+    """
+    LangChain cache for a chat model, keyed by a hash of the serialized prompt, the
+    model settings (including bound tools) and the vault state version.
+    """
+
+    def __init__(self, store: LLMCacheStore, ttl: float):
+        self.store = store
+        self.ttl = ttl
+
+    def _key(self, prompt: str, llm_string: str) -> str:
+        return self.store.key(prompt, llm_string)
+
+    def lookup(self, prompt: str, llm_string: str) -> Optional[RETURN_VAL_TYPE]:
+        response = self.store.get(self._key(prompt, llm_string))
+        if response is None:
+            self.store.misses += 1
+            return None
+
+        self.store.exact_hits += 1
+        return loads(response)
+
+    def update(self, prompt: str, llm_string: str, return_val: RETURN_VAL_TYPE):
+        self.store.put(self._key(prompt, llm_string), dumps(return_val), self.ttl)
+
+    def clear(self, **kwargs: Any):
+        self.store.clear()
+
+llm_cache_store = LLMCacheStore(Config.LLM_CACHE_PATH)
+
+def invalidate_llm_cache():
+    llm_cache_store.invalidate()
+
+__all__ = ['LLMResponseCache', 'llm_cache_store', 'invalidate_llm_cache']
@@ -0,0 +1,270 @@
+""" Central gateway for LLM calls: concurrency, token budget, priority, routing, metrics """
+
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGenerationChunk, ChatResult
+
+from config import Config
+from .deadline import with_deadline
+
+logger = logging.getLogger(__name__)
+
+# Lower runs first
+PRIORITIES = {"admin": 0, "risk": 1, "user": 2}
+
+# Expected completion size, reserved against the token budget until the real usage is known
+OUTPUT_TOKENS_ESTIMATE = 1024
+
+# Requests mentioning these are routed to the reasoning model when auto routing is on
+COMPLEX_HINTS = ("analy", "realloc", "strateg", "risk", "compare", "why", "should")
+
+def _estimate_tokens(messages: List[BaseMessage]) -> int:
+    return sum(len(str(message.content)) for message in messages) // 4
+
+def _usage_tokens(message) -> Optional[int]:
+    usage = getattr(message, "usage_metadata", None)
+    return usage["total_tokens"] if usage else None
+
+class ModelGate:
+    """
+    Admission control for one model.
+
+    At most `max_concurrency` calls run at once, and the tokens granted over the last
+    minute stay under `tokens_per_minute` (a single oversized call still goes through
+    once the window is empty). Waiting calls are granted by priority, then arrival.
+    """
+
+    def __init__(self, model: str, max_concurrency: int, tokens_per_minute: int):
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self.active = 0
+        self.waiters: List[Tuple[int, int, int, asyncio.Future]] = []
+        self.sequence = itertools.count()
+        self.usage: Deque[List] = deque()  # [granted at, tokens] per call over the last minute
+        self.retry_handle: Optional[asyncio.TimerHandle] = None
+
+        # Metrics
+        self.calls = 0
+        self.failures = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.total_latency = 0.0
+        self.total_wait = 0.0
+        self.last_latency: Optional[float] = None
+
+    def _tokens_used(self, now: float) -> int:
+        while self.usage and self.usage[0][0] <= now - 60:
+            self.usage.popleft()
+        return sum(tokens for _, tokens in self.usage)
+
+    def _dispatch(self):
+        self.retry_handle = None
+        now = time.time()
+        while self.waiters and self.active < self.max_concurrency:
+            _, _, tokens, future = self.waiters[0]
+            if future.done():  # cancelled while waiting
+                heapq.heappop(self.waiters)
+                continue
+
+            used = self._tokens_used(now)
+            if used and used + tokens > self.tokens_per_minute:
+                # Budget spent, retry when the oldest usage leaves the window
+                delay = self.usage[0][0] + 60 - now
+                self.retry_handle = asyncio.get_running_loop().call_later(max(delay, 0.1), self._dispatch)
+                return
+
+            heapq.heappop(self.waiters)
+            self.active += 1
+            grant = [now, tokens]
+            self.usage.append(grant)
+            future.set_result(grant)
+
+    async def acquire(self, priority: int, tokens: int) -> List:
+        """Wait for a slot and `tokens` of budget, returns the grant to pass to `release`"""
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self.waiters, (priority, next(self.sequence), tokens, future))
+        if self.retry_handle is None:
+            self._dispatch()
+
+        try:
+            return await future
+        except asyncio.CancelledError:
+            # Granted just before the cancellation, give the slot back
+            if future.done() and not future.cancelled():
+                self.release(future.result(), 0)
+            raise
+
+    def release(self, grant: List, used: Optional[int]):
+        """Free the slot, the grant's reserved tokens are replaced by the actual usage, at the grant time"""
+        self.active -= 1
+        if used is not None:
+            grant[1] = used
+        # The freed slot or budget may admit a waiter before the scheduled retry
+        if self.retry_handle is not None:
+            self.retry_handle.cancel()
+        self._dispatch()
+
+    def metrics(self) -> Dict[str, Any]:
+        return {
+            "active": self.active,
+            "waiting": sum(1 for *_, future in self.waiters if not future.done()),
+            "tokens_last_minute": self._tokens_used(time.time()),
+            "calls": self.calls,
+            "failures": self.failures,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "avg_latency": self.total_latency / self.calls if self.calls else None,
+            "avg_wait": self.total_wait / self.calls if self.calls else None,
+            "last_latency": self.last_latency,
+        }
+
+_gates: Dict[str, ModelGate] = {}
+
+def get_gate(model: str) -> ModelGate:
+    if model not in _gates:
+        _gates[model] = ModelGate(model, Config.LLM_MAX_CONCURRENCY, Config.LLM_TOKENS_PER_MINUTE)
+    return _gates[model]
+
+def gateway_metrics() -> Dict[str, Dict]:
+    return {model: gate.metrics() for model, gate in _gates.items()}
+
+def _model_name(model: BaseChatModel) -> str:
+    return getattr(model, "model", None) or getattr(model, "model_name", "unknown")
+
+class GatewayChatModel(BaseChatModel):
+    """
+    Chat model sending every call through the gateway of the model it routes to.
+
+    Calls go to `interpreter` or `reasoning` as chosen by `default`; with `auto_route`,
+    short requests go to the interpreter and long or analytical ones to the reasoning model.
+    """
+
+    interpreter: BaseChatModel
+    reasoning: BaseChatModel
+    default: str = "interpreter"
+    auto_route: bool = False
+    priority: int = PRIORITIES["user"]
+
+    @property
+    def _llm_type(self) -> str:
+        return "gateway"
+
+    @property
+    def _identifying_params(self) -> Dict[str, Any]:
+        return {
+            "interpreter": _model_name(self.interpreter),
+            "reasoning": _model_name(self.reasoning),
+            "default": self.default,
+            "auto_route": self.auto_route,
+        }
+
+    def _route(self, messages: List[BaseMessage]) -> BaseChatModel:
+        if not self.auto_route:
+            return self.interpreter if self.default == "interpreter" else self.reasoning
+
+        if _estimate_tokens(messages) > Config.LLM_ROUTE_COMPLEX_TOKENS:
+            return self.reasoning
+        last_human = next((m for m in reversed(messages) if isinstance(m, HumanMessage)), None)
+        if last_human and any(hint in str(last_human.content).lower() for hint in COMPLEX_HINTS):
+            return self.reasoning
+        return self.interpreter
+
+    def bind_tools(self, tools, **kwargs):
+        # Tools are formatted by the provider model, the binding is kept on the gateway
+        bound = self.interpreter.bind_tools(tools, **kwargs)
+        return self.bind(**bound.kwargs)
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[CallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        # Sync calls are not used by the agent, they skip admission control
+        return self._route(messages)._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> ChatResult:
+        model = self._route(messages)
+        gate = get_gate(_model_name(model))
+        reserved = _estimate_tokens(messages) + OUTPUT_TOKENS_ESTIMATE
+
+        queued = time.time()
+        grant = await with_deadline(gate.acquire(self.priority, reserved), what=f"{gate.model} queue")
+        started = time.time()
+        used = None
+        try:
+            result = await with_deadline(
+                model._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs),
+                cap=Config.LLM_CALL_TIMEOUT,
+                what=f"LLM call {gate.model}"
+            )
+            used = _usage_tokens(result.generations[0].message) if result.generations else None
+            self._record(gate, result.generations[0].message if result.generations else None, queued, started)
+            return result
+        except Exception:
+            gate.failures += 1
+            raise
+        finally:
+            gate.release(grant, used)
+
+    async def _astream(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[AsyncCallbackManagerForLLMRun] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        model = self._route(messages)
+        gate = get_gate(_model_name(model))
+        reserved = _estimate_tokens(messages) + OUTPUT_TOKENS_ESTIMATE
+
+        queued = time.time()
+        grant = await with_deadline(gate.acquire(self.priority, reserved), what=f"{gate.model} queue")
+        started = time.time()
+        merged = None
+        # A stalled stream is bounded by the client timeout, set per read (see model_util)
+        try:
+            async for chunk in model._astream(messages, stop=stop, run_manager=run_manager, **kwargs):
+                merged = chunk.message if merged is None else merged + chunk.message
+                yield chunk
+            self._record(gate, merged, queued, started)
+        except Exception:
+            gate.failures += 1
+            raise
+        finally:
+            gate.release(grant, _usage_tokens(merged) if merged is not None else None)
+
+    def _record(self, gate: ModelGate, message, queued: float, started: float):
+        latency = time.time() - started
+        gate.calls += 1
+        gate.total_latency += latency
+        gate.total_wait += started - queued
+        gate.last_latency = latency
+
+        usage = getattr(message, "usage_metadata", None)
+        if usage:
+            gate.input_tokens += usage["input_tokens"]
+            gate.output_tokens += usage["output_tokens"]
+        logger.debug(
+            f"LLM call {gate.model}: {latency:.2f}s, waited {started - queued:.2f}s, "
+            f"tokens {usage['total_tokens'] if usage else 'unknown'}"
+        )
+
+__all__ = ['GatewayChatModel', 'PRIORITIES', 'gateway_metrics']
@@ -1,6 +1,8 @@
 import os
+import asyncio
+import logging
 
-from typing import List, TypedDict
+from typing import Collection, Dict, List, Optional, TypedDict
 from dataclasses import dataclass
 from web3 import Web3
 
@@ -8,8 +10,18 @@ from .constants import VAULT_ADDRESS
 from .market_api import MorphoAPIClient, Market, VaultResponse
 from .market_db import get_market_operations
 from .market_onchain import MarketReader
+from .prompt_encoding import encode_table, pct, short_id, usdc_k
+from .deadline import bounded_timeout
+from config import Config
 
-web3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL")))
+logger = logging.getLogger(__name__)
+
+# Market history snapshot fetching
+SNAPSHOT_CONCURRENCY = 8
+ONCHAIN_TIMEOUT = 10  # seconds
+API_TIMEOUT = 10  # seconds
+
+web3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL"), request_kwargs={"timeout": Config.RPC_TIMEOUT}))
 market_reader = MarketReader(web3)
 
 @dataclass
@@ -37,8 +49,8 @@ class MarketSnapshot(TypedDict):
     total_supply: int
     total_borrow: int
     liquidity: int
-    supply_apy: float
-    borrow_apy: float
+    supply_apy: Optional[float]  # None when the API didn't answer
+    borrow_apy: Optional[float]
 
 async def get_morpho_markets() -> List[Market]:
     """Get all Morpho markets"""
@@ -69,56 +81,171 @@ async def get_vault_markets() -> List[MarketInfo]:
         print(f"Error getting vault allocations: {e}")
         return []
 
+async def get_vault_allocations() -> Dict[str, int]:
+    """Get vault supply per market, keyed by market id without 0x prefix"""
+    vault = await MorphoAPIClient.get_vault_data(VAULT_ADDRESS)
+    if not vault:
+        return {}
 
-async def get_vault_allocations_summary() -> str:
+    return {
+        alloc.market["uniqueKey"].lower().replace('0x', ''): alloc.supplyAssets
+        for alloc in vault.state.allocation
+    }
+
+async def get_vault_allocations_summary(max_tokens: Optional[int] = None) -> str:
+    """Vault overview and its markets as a compact table, largest allocations first"""
     vault = await MorphoAPIClient.get_vault_data(VAULT_ADDRESS)
     markets = await get_morpho_markets()
     
     # Process data
-    approved_market_ids = {alloc.market["id"] for alloc in vault.state.allocation}
-    approved_markets = [m for m in markets if m.id in approved_market_ids]
-    other_markets = [m for m in markets if m.id not in approved_market_ids]
-    
-    # Format response
-    response = [
-        f"Vault Analysis (${vault.state.totalAssetsUsd:,.2f} TVL)",
-        f"Current APY: {vault.state.apy * 100:.2f}%",
-        f"All-time APY: {vault.state.allTimeApy * 100:.2f}%\n"
-    ]
-    
-    # Format approved markets
-    response.append("\n🟢 Approved Markets (Can reallocate):")
-    for market in approved_markets:
-
-        # Get on-chain stats
-        stats = await market_reader.get_market_data(market.uniqueKey)
-
-        allocation = next(a for a in vault.state.allocation if a.market["id"] == market.id)
-        response.extend([
-            f"\n- {market.collateralAsset.symbol}-{market.loanAsset.symbol} ({market.uniqueKey})",
-            f"  Current Supply: {allocation.supplyAssets/1e6:,.2f} USDC",
-            f"  Supply Cap: {allocation.supplyCap/1e6:,.2f} USDC",
-            f"  APY: {market.state.supplyApy * 100:.2f}%"
-            f"  Liquidity: {float(stats['liquidity'])/1e6:,.2f} USDC"
-        ])
-        
-    return "\n".join(response)
+    allocations = {alloc.market["id"]: alloc for alloc in vault.state.allocation}
+    approved_markets = [m for m in markets if m.id in allocations]
+
+    # Get on-chain stats
+    all_stats = await asyncio.gather(*[market_reader.get_market_data(m.uniqueKey) for m in approved_markets])
+
+    rows, scores = [], []
+    for market, stats in zip(approved_markets, all_stats):
+        allocation = allocations[market.id]
+        rows.append((
+            f"{market.collateralAsset.symbol}-{market.loanAsset.symbol}",
+            market.uniqueKey,
+            usdc_k(allocation.supplyAssets),
+            usdc_k(allocation.supplyCap),
+            pct(market.state.supplyApy * 100),
+            usdc_k(float(stats['liquidity'])) if stats else "-"
+        ))
+        scores.append(allocation.supplyAssets)
 
-async def format_market_history(market_stats: List[MarketSnapshot]) -> str:
-    """Format market history for display"""
-    market_summaries = []
+    table = encode_table(
+        ("market", "id", "supply_k", "cap_k", "apy%", "liquidity_k"),
+        rows, scores, max_tokens
+    )
+    return (
+        f"Vault: TVL ${vault.state.totalAssetsUsd:,.0f}, APY {vault.state.apy * 100:.2f}%, "
+        f"all-time APY {vault.state.allTimeApy * 100:.2f}%\n"
+        f"Approved markets (can reallocate), amounts in thousands of USDC:\n{table}"
+    )
+
+def _ratio(numerator: float, denominator: float) -> float:
+    return numerator / denominator if denominator else 0.0
+
+def _in_markets(market_id: str, market_ids: Optional[Collection[str]]) -> bool:
+    """Whether a market is listed in `market_ids` (ids without 0x prefix), any market if None"""
+    return market_ids is None or market_id.lower().replace('0x', '') in market_ids
+
+async def format_market_history(
+    market_stats: List[MarketSnapshot],
+    max_tokens: Optional[int] = None,
+    market_ids: Optional[Collection[str]] = None
+) -> str:
+    """
+    Market flows and state as a compact table, most active and most utilized markets first.
+    With `market_ids` (e.g. the vault markets), other markets are left out.
+    """
+    rows, scores = [], []
     for market in market_stats:
-        summary = (
-            f"Market {market['id']}:\n"
-            f"Net Supply: {market['net_supply']/1e6:+,.2f} USDC "
-            f"({market['net_supply']/market['total_supply']*100:+.1f}% change)\n"
-            f"Net Borrow: {market['net_borrow']/1e6:+,.2f} USDC "
-            f"({market['net_borrow']/market['total_borrow']*100:+.1f}% change)\n"
-            f"Current APY - Supply: {market['supply_apy']:.2f}%, Borrow: {market['borrow_apy']:.2f}%"
+        if not _in_markets(market['id'], market_ids):
+            continue
+        utilization = _ratio(market['total_borrow'], market['total_supply'])
+        supply_change = _ratio(market['net_supply'], market['total_supply'])
+        borrow_change = _ratio(market['net_borrow'], market['total_borrow'])
+        rows.append((
+            short_id(market['id']),
+            usdc_k(market['total_supply']),
+            usdc_k(market['total_borrow']),
+            pct(utilization * 100),
+            usdc_k(market['net_supply']),
+            f"{supply_change * 100:+.1f}",
+            usdc_k(market['net_borrow']),
+            f"{borrow_change * 100:+.1f}",
+            pct(market['supply_apy']),
+            pct(market['borrow_apy'])
+        ))
+        scores.append(utilization + abs(supply_change) + abs(borrow_change))
+
+    return encode_table(
+        ("market", "supply_k", "borrow_k", "util%", "net_supply_k", "net_supply%",
+         "net_borrow_k", "net_borrow%", "supply_apy%", "borrow_apy%"),
+        rows, scores, max_tokens
+    )
+
+async def format_flow_horizons(
+    horizons: List[int] = (1, 24, 168),
+    max_tokens: Optional[int] = None,
+    market_ids: Optional[Collection[str]] = None
+) -> str:
+    """
+    Net supply / borrow per market over several horizons (in hours), in thousands of USDC.
+    With `market_ids` (e.g. the vault markets), other markets are left out.
+    """
+    flows: Dict[str, Dict[int, dict]] = {}
+    for hours in horizons:
+        for market in await get_market_operations(hours) or []:
+            if _in_markets(market['id'], market_ids):
+                flows.setdefault(market['id'], {})[hours] = market
+
+    rows, scores = [], []
+    for market_id, by_horizon in flows.items():
+        row = [short_id(market_id)]
+        score = 0
+        for hours in horizons:
+            market = by_horizon.get(hours)
+            net_supply = market['supply'] - market['withdraw'] if market else 0
+            net_borrow = market['borrow'] - market['repay'] if market else 0
+            row.extend((usdc_k(net_supply), usdc_k(net_borrow)))
+            score += abs(net_supply) + abs(net_borrow)
+        rows.append(row)
+        scores.append(score)
+
+    columns = ["market"]
+    for hours in horizons:
+        columns.extend((f"{hours}h_net_supply_k", f"{hours}h_net_borrow_k"))
+    return encode_table(columns, rows, scores, max_tokens)
+
+async def _fetch_with_timeout(coro, timeout: float, source: str, market_id: str):
+    """Await a data source, degrade to None on timeout or error"""
+    timeout = bounded_timeout(timeout)
+    try:
+        return await asyncio.wait_for(coro, timeout=timeout)
+    except asyncio.TimeoutError:
+        logger.warning(f"{source} timed out after {timeout}s for market {market_id}")
+    except Exception as e:
+        logger.warning(f"{source} failed for market {market_id}: {e}")
+    return None
+
+async def _build_market_snapshot(market: dict, semaphore: asyncio.Semaphore) -> Optional[MarketSnapshot]:
+    """Fetch on-chain state and APYs of one market concurrently"""
+    market_id = market['id']
+
+    async with semaphore:
+        stats, apys = await asyncio.gather(
+            _fetch_with_timeout(market_reader.get_market_data(market_id), ONCHAIN_TIMEOUT, "On-chain read", market_id),
+            _fetch_with_timeout(MorphoAPIClient.get_market_apys(market_id), API_TIMEOUT, "APY query", market_id)
         )
-        market_summaries.append(summary)
 
-    return "\n".join(market_summaries)
+    # Without on-chain totals the flows can't be put in context
+    if not stats:
+        return None
+
+    # Calculate net movements
+    net_supply = market['supply'] - market['withdraw']
+    net_borrow = market['borrow'] - market['repay']
+
+    return MarketSnapshot(
+        id=market_id,
+        supply=market['supply'],
+        borrow=market['borrow'],
+        withdraw=market['withdraw'],
+        repay=market['repay'],
+        net_supply=net_supply,
+        net_borrow=net_borrow,
+        total_supply=stats['supply_assets'],
+        total_borrow=stats['borrow_assets'],
+        liquidity=stats['liquidity'],
+        supply_apy=apys['supply_apy'] if apys else None,
+        borrow_apy=apys['borrow_apy'] if apys else None
+    )
 
 async def get_all_market_history(hours_ago: int = 1) -> List[MarketSnapshot]:
     """ Get a list of market snapshots with net flows over a period of time"""
@@ -128,41 +255,10 @@ async def get_all_market_history(hours_ago: int = 1) -> List[MarketSnapshot]:
     if not operations:
         return []
 
-    api_client = MorphoAPIClient()
-    
-    consolidated_data = []
-    for market in operations:
-        market_id = market['id']
-        
-        # Get on-chain stats
-        stats = await market_reader.get_market_data(market_id)
-        if not stats:
-            continue
-            
-        # Get APYs from API
-        apys = await api_client.get_market_apys(market_id)
-        if not apys:
-            continue
-            
-        # Calculate net movements
-        net_supply = market['supply'] - market['withdraw']
-        net_borrow = market['borrow'] - market['repay']
-        
-        snapshot = MarketSnapshot(
-            id=market_id,
-            supply=market['supply'],
-            borrow=market['borrow'],
-            withdraw=market['withdraw'],
-            repay=market['repay'],
-            net_supply=net_supply,
-            net_borrow=net_borrow,
-            total_supply=stats['supply_assets'],
-            total_borrow=stats['borrow_assets'],
-            liquidity=stats['liquidity'],
-            supply_apy=apys['supply_apy'],
-            borrow_apy=apys['borrow_apy']
-        )
-        
-        consolidated_data.append(snapshot)
-    
-    return consolidated_data 
\ No newline at end of file
+    # All markets are fetched together, bounded by SNAPSHOT_CONCURRENCY
+    semaphore = asyncio.Semaphore(SNAPSHOT_CONCURRENCY)
+    snapshots = await asyncio.gather(*[
+        _build_market_snapshot(market, semaphore) for market in operations
+    ])
+
+    return [snapshot for snapshot in snapshots if snapshot]
@@ -10,11 +10,19 @@ from .constants import (
     GET_VAULT_QUERY
 )
 from .market_onchain import MarketReader
+from .deadline import bounded_timeout
+from config import Config
 from web3 import Web3
 import os
 import asyncio
 
-web3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL")))
+# Morpho API requests, shortened to the deadline of the event they serve
+REQUEST_TIMEOUT = 15  # seconds
+
+def _client_timeout() -> aiohttp.ClientTimeout:
+    return aiohttp.ClientTimeout(total=bounded_timeout(REQUEST_TIMEOUT))
+
+web3 = Web3(Web3.HTTPProvider(os.getenv("RPC_URL"), request_kwargs={"timeout": Config.RPC_TIMEOUT}))
 market_reader = MarketReader(web3)
 
 class MarketParams(BaseModel):
@@ -87,7 +95,7 @@ class MorphoAPIClient:
     @staticmethod
     async def get_market_apys(market_id: str) -> Dict:
         """Get market APYs"""
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=_client_timeout()) as session:
             # prefix with 0x if not already
             if not market_id.startswith("0x"):
                 market_id = "0x" + market_id
@@ -112,7 +120,7 @@ class MorphoAPIClient:
     @staticmethod
     async def get_all_markets() -> List[Market]:
         """Get all USDC markets"""
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=_client_timeout()) as session:
             try:
                 variables = {
                     "first": 100,
@@ -143,7 +151,7 @@ class MorphoAPIClient:
     @staticmethod
     async def get_vault_data(vault_id: str) -> VaultResponse:
         """Get vault data with on-chain position verification"""
-        async with aiohttp.ClientSession() as session:
+        async with aiohttp.ClientSession(timeout=_client_timeout()) as session:
             try:
                 async with session.post(
                     MORPHO_API_URL,
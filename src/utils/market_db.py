@@ -1,32 +1,25 @@
 # For Supabase database operations
-from collections import defaultdict
+from datetime import datetime, timedelta, timezone
 from typing import Dict
 
 from .supabase import SupabaseClient
+from .flow_rollup import flow_rollup, FLOW_EVENTS
 
 async def get_market_operations(hours_ago: int = 1) -> Dict:
-    """Get market operations from Supabase DB"""
-    market_events = await SupabaseClient.get_filtered_market_events(hours_ago=hours_ago)
-    if not market_events:
-        return None
-        
-    markets = defaultdict(lambda: {
-        'id': '',
-        'borrow': 0,
-        'supply': 0,
-        'withdraw': 0,
-        'repay': 0
-    })
-    
-    for event in market_events:
-        op_type = event['event']
-        amount = float(event['amount']) if event['amount'] else 0
-        market_id = event['market']
+    """Get market operations over the last hours, from the local rollup mirror or the DB"""
+    start_time = datetime.now(timezone.utc) - timedelta(hours=hours_ago)
+
+    if flow_rollup.covers(start_time.timestamp()):
+        return flow_rollup.totals(start_time.timestamp()) or None
 
-        if not op_type or not amount or not market_id:
-            continue
-        
-        markets[market_id]['id'] = market_id
-        markets[market_id][op_type] += amount
+    # Totals are summed in SQL from the per-minute rollup, one row per market
+    flow_totals = await SupabaseClient.get_market_flow_rollup(start_time)
+    if not flow_totals:
+        return None
 
-    return list(markets.values()) 
\ No newline at end of file
+    # numeric comes back as an exact JSON number, keep it as int
+    return [
+        {'id': row['market'], **{event: int(row[event] or 0) for event in FLOW_EVENTS}}
+        for row in flow_totals
+        if row['market']
+    ]
@@ -2,6 +2,7 @@
 from web3 import Web3
 from typing import Dict, List, Tuple
 import json
+import asyncio
 from pathlib import Path
 from .constants import MORPHO_BLUE_ADDRESS  # Update import
 import logging
@@ -26,7 +27,8 @@ class MarketReader:
             if not market_id.startswith('0x'):
                 market_id = f"0x{market_id}"
             
-            market = self.morpho.functions.market(market_id).call()
+            # Run the blocking RPC call in a thread, so several markets can be read concurrently
+            market = await asyncio.to_thread(self.morpho.functions.market(market_id).call)
             
             supply_assets = int(market[0])
             borrow_assets = int(market[2])
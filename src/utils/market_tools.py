@@ -1,15 +1,29 @@
 """ Tools for LangGraph """
 
+from typing import Optional
 from langchain_core.tools import tool
 from .market import get_morpho_markets, get_vault_allocations_summary
+from .market_api import MorphoAPIClient
+from .constants import VAULT_ADDRESS
+from .prompt_encoding import encode_table, pct, short_id
+from .optimizer import get_vault_snapshot, optimize_allocation, format_plan
+from .tool_memo import memoized
+from .deadline import time_bounded
+from config import Config
 from utils.activity_types import MARKET_DATA_FETCHED, VAULT_DATA_FETCHED
 import time
 
 # Create versions of tools that can access the agent
-def create_market_tools(agent):
-    """Create market tools with access to the agent for broadcasting"""
+def create_market_tools(agent, token_budget: Optional[int] = None):
+    """
+    Create market tools with access to the agent for broadcasting, memoized within a run
+    and bounded by TOOL_TIMEOUT.
+    Market tables are cut to `token_budget` tokens, set per graph.
+    """
     
     @tool
+    @memoized
+    @time_bounded(Config.TOOL_TIMEOUT)
     async def fetch_all_morpho_markets() -> str:
         """Fetch and format all Morpho Blue markets"""
         try:
@@ -22,19 +36,33 @@ def create_market_tools(agent):
                 })
                 
             markets = await get_morpho_markets()
-            
-            # Format the market data for readable output
-            response = ["Available Morpho Markets:"]
+            vault = await MorphoAPIClient.get_vault_data(VAULT_ADDRESS)
+            vault_market_ids = {alloc.market["id"] for alloc in vault.state.allocation} if vault else set()
+            vault_apy = vault.state.apy if vault else 0.0
+
+            # Vault markets first, then the markets whose APY differs most from the vault's
+            rows, scores = [], []
             for market in markets:
-                response.append(
-                    f"\n- {market.collateralAsset.symbol}-{market.loanAsset.symbol}"
-                    f"\n  TVL: ${market.state.supplyAssetsUsd:,.2f}"
-                    f"\n  Utilization: {market.state.utilization * 100:.1f}%"
-                    f"\n  Supply APY: {market.state.supplyApy * 100:.2f}%"
-                    f"\n  Borrow APY: {market.state.borrowApy * 100:.2f}%"
+                in_vault = market.id in vault_market_ids
+                rows.append((
+                    f"{market.collateralAsset.symbol}-{market.loanAsset.symbol}",
+                    short_id(market.uniqueKey),
+                    f"{market.state.supplyAssetsUsd / 1e3:,.1f}",
+                    pct(market.state.utilization * 100),
+                    pct(market.state.supplyApy * 100),
+                    pct(market.state.borrowApy * 100),
+                    "y" if in_vault else "n"
+                ))
+                scores.append(
+                    (10.0 if in_vault else 0.0)
+                    + abs(market.state.supplyApy - vault_apy)
+                    + market.state.utilization
                 )
-            
-            result = "\n".join(response)
+
+            result = "Morpho markets, TVL in thousands of USD:\n" + encode_table(
+                ("market", "id", "tvl_k", "util%", "supply_apy%", "borrow_apy%", "in_vault"),
+                rows, scores, token_budget
+            )
             
             # Broadcast a preview of the results
             if agent and agent.ws_manager:
@@ -61,6 +89,8 @@ def create_market_tools(agent):
             return f"Error fetching markets: {str(e)}"
 
     @tool
+    @memoized
+    @time_bounded(Config.TOOL_TIMEOUT)
     async def fetch_vault_market_status() -> str:
         """Get all of the markets and their allocations in the vault"""
         try:
@@ -72,7 +102,7 @@ def create_market_tools(agent):
                     "timestamp": time.time()
                 })
                 
-            result = await get_vault_allocations_summary()
+            result = await get_vault_allocations_summary(token_budget)
 
             # Broadcast with more details
             if agent and agent.ws_manager:
@@ -95,5 +125,40 @@ def create_market_tools(agent):
                 })
             return f"Error analyzing vault markets: {str(e)}"
             
+    @tool
+    @memoized
+    @time_bounded(Config.TOOL_TIMEOUT)
+    async def optimize_reallocation() -> str:
+        """
+        Compute the yield-maximizing reallocation of the vault.
+
+        Respects the liquidity of each market, supply caps and the 70% concentration limit,
+        and projects supply APYs along the interest rate curve.
+        Returns the target allocations and a reallocation list ready for the reallocate tool.
+        """
+        try:
+            if agent and agent.ws_manager:
+                await agent.broadcast_activity(VAULT_DATA_FETCHED, {
+                    "message": "Computing optimal reallocation",
+                    "source": "Reallocation solver",
+                    "timestamp": time.time()
+                })
+
+            snapshot = await get_vault_snapshot()
+            plan = optimize_allocation(snapshot)
+            result = format_plan(snapshot, plan)
+
+            if agent and agent.ws_manager:
+                await agent.broadcast_activity(VAULT_DATA_FETCHED, {
+                    "message": "Reallocation plan computed",
+                    "current_apy": f"{plan.current_apy * 100:.2f}%",
+                    "projected_apy": f"{plan.projected_apy * 100:.2f}%",
+                    "timestamp": time.time()
+                })
+
+            return result
+        except Exception as e:
+            return f"Error computing reallocation: {str(e)}"
+
     # Return the tools with access to the agent
-    return [fetch_all_morpho_markets, fetch_vault_market_status]
+    return [fetch_all_morpho_markets, fetch_vault_market_status, optimize_reallocation]
@@ -36,7 +36,8 @@ async def add_long_term_memory(summary: str, metadata: dict):
           "type": str: "information","documentation","news"
         }
     """
-    long_term_memory.add_documents([Document(
+    # Vector store is synchronous, the async variants run it in an executor
+    await long_term_memory.aadd_documents([Document(
         page_content=summary,
         metadata=metadata,
     )])
@@ -52,7 +53,7 @@ async def get_long_term_memory(query: str, filter: dict):
         query: The query to search the long term memory
         filter: The filter by metadata, example: {"type": "user", "timestamp": 1723081200}
     """
-    docs = long_term_memory.similarity_search(
+    docs = await long_term_memory.asimilarity_search(
         query,
         k=5,
         filter=filter
@@ -1,24 +1,49 @@
-from typing import Literal
+from typing import Literal, Optional
 from config import Config
 from langchain_anthropic import ChatAnthropic
 from langchain_openai import ChatOpenAI
+from .llm_cache import LLMResponseCache, llm_cache_store
+from .llm_gateway import GatewayChatModel, PRIORITIES
 
 
 # Define model options
 ModelType = Literal["anthropic", "openai"]
+CacheMode = Literal["exact"]
+Priority = Literal["admin", "risk", "user"]
 
-# Get LLM instance based on type and purpose
-def get_llm(model_type: ModelType, is_interpreter: bool = False):
-    """Get LLM instance based on type and purpose"""
+def _get_cache(cache: Optional[CacheMode]) -> Optional[LLMResponseCache]:
+    """Exact: identical prompts on the same vault state"""
+    if cache == "exact":
+        return LLMResponseCache(llm_cache_store, ttl=Config.LLM_CACHE_TTL)
+    return None
+
+def _get_model(model_type: ModelType, is_interpreter: bool):
     if (model_type == "anthropic"):
         model = "claude-3-5-haiku-20241022" if is_interpreter else "claude-3-5-sonnet-20241022"
-        return ChatAnthropic(
-            model=model,
-            api_key=Config.ANTHROPIC_API_KEY
-        )
+        return ChatAnthropic(model=model, api_key=Config.ANTHROPIC_API_KEY, timeout=Config.LLM_CALL_TIMEOUT)
     else:
         model = "gpt-4o-mini" if is_interpreter else "gpt-4o-2024-11-20"
-        return ChatOpenAI(
-            model=model,
-            api_key=Config.OPENAI_API_KEY
-        )
+        return ChatOpenAI(model=model, api_key=Config.OPENAI_API_KEY, timeout=Config.LLM_CALL_TIMEOUT)
+
+# Get LLM instance based on type and purpose
+def get_llm(
+    model_type: ModelType,
+    is_interpreter: bool = False,
+    cache: Optional[CacheMode] = None,
+    priority: Priority = "user",
+    auto_route: bool = False
+):
+    """
+    Get LLM instance based on type and purpose, responses are cached if `cache` is set.
+
+    Calls go through the LLM gateway with the given priority. With `auto_route`, simple
+    requests use the interpreter model and complex ones the reasoning model.
+    """
+    return GatewayChatModel(
+        interpreter=_get_model(model_type, is_interpreter=True),
+        reasoning=_get_model(model_type, is_interpreter=False),
+        default="interpreter" if is_interpreter else "reasoning",
+        auto_route=auto_route,
+        priority=PRIORITIES[priority],
+        cache=_get_cache(cache)
+    )
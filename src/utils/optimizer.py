@@ -0,0 +1,227 @@
+""" Deterministic reallocation solver for the vault """
+
+from dataclasses import dataclass, field
+import json
+from typing import Dict, List
+import logging
+
+from .constants import VAULT_ADDRESS
+from .market_api import MorphoAPIClient
+from .market import get_morpho_markets, market_reader
+from .action_provider import MorphoAssetMovement
+
+logger = logging.getLogger(__name__)
+
+# The biggest market cannot hold more than this share of the vault
+MAX_CONCENTRATION = 0.7
+# AdaptiveCurveIRM parameters
+TARGET_UTILIZATION = 0.9
+CURVE_STEEPNESS = 4.0
+# Number of increments the vault assets are split into by the solver
+SOLVER_STEPS = 500
+# Don't bother moving less than this (1 USDC)
+MIN_MOVE_AMOUNT = 1_000000
+
+@dataclass
+class MarketPosition:
+    """State of one vault market as seen by the solver"""
+    market_id: str
+    name: str
+    allocation: int  # vault supply in the market
+    supply_cap: int
+    total_supply: int
+    total_borrow: int
+    borrow_apy: float  # current borrow APY (ratio, 0.05 = 5%)
+    supply_apy: float  # current supply APY (ratio)
+
+    @property
+    def liquidity(self) -> int:
+        return max(self.total_supply - self.total_borrow, 0)
+
+    @property
+    def utilization(self) -> float:
+        return self.total_borrow / self.total_supply if self.total_supply else 0.0
+
+@dataclass
+class VaultSnapshot:
+    """Allocations, caps and liquidity of every market of the vault"""
+    markets: List[MarketPosition] = field(default_factory=list)
+
+    @property
+    def total_assets(self) -> int:
+        return sum(m.allocation for m in self.markets)
+
+@dataclass
+class ReallocationPlan:
+    """Solver output, ready to pass to the reallocate action"""
+    movements: List[MorphoAssetMovement]
+    target_allocations: Dict[str, int]
+    current_apy: float
+    projected_apy: float
+
+def _curve(utilization: float) -> float:
+    """AdaptiveCurveIRM multiplier applied to the rate at target"""
+    if utilization > TARGET_UTILIZATION:
+        err = (utilization - TARGET_UTILIZATION) / (1 - TARGET_UTILIZATION)
+        return (CURVE_STEEPNESS - 1) * err + 1
+    err = (utilization - TARGET_UTILIZATION) / TARGET_UTILIZATION
+    return (1 - 1 / CURVE_STEEPNESS) * err + 1
+
+class _MarketModel:
+    """Projects the supply APY of a market when the vault allocation changes"""
+
+    def __init__(self, market: MarketPosition):
+        self.market = market
+        utilization = min(market.utilization, 1.0)
+        curve = _curve(utilization)
+        self.rate_at_target = market.borrow_apy / curve if curve else 0.0
+        # Calibrate the fee so that the model matches the current supply APY
+        expected = market.borrow_apy * utilization
+        self.fee_factor = min(market.supply_apy / expected, 1.0) if expected else 1.0
+
+    def supply_apy(self, allocation: int) -> float:
+        total_supply = self.market.total_supply - self.market.allocation + allocation
+        if total_supply <= 0:
+            return 0.0
+        utilization = min(self.market.total_borrow / total_supply, 1.0)
+        borrow_apy = self.rate_at_target * _curve(utilization)
+        return borrow_apy * utilization * self.fee_factor
+
+    def yield_of(self, allocation: int) -> float:
+        return allocation * self.supply_apy(allocation)
+
+def _bounds(snapshot: VaultSnapshot, max_concentration: float) -> Dict[str, tuple]:
+    """Lower / upper allocation bound of each market"""
+    concentration_cap = int(snapshot.total_assets * max_concentration)
+    bounds = {}
+    for m in snapshot.markets:
+        # Liquidity constraint: we can only withdraw what is not borrowed
+        lower = max(m.allocation - m.liquidity, 0)
+        upper = max(min(m.supply_cap, concentration_cap), lower)
+        bounds[m.market_id] = (lower, upper)
+    return bounds
+
+def _to_movements(current: Dict[str, int], target: Dict[str, int]) -> List[MorphoAssetMovement]:
+    """Pair withdrawals with supplies into a list of asset movements"""
+    withdrawals = [[mid, current[mid] - target[mid]] for mid in current if current[mid] - target[mid] >= MIN_MOVE_AMOUNT]
+    supplies = [[mid, target[mid] - current[mid]] for mid in current if target[mid] - current[mid] >= MIN_MOVE_AMOUNT]
+    withdrawals.sort(key=lambda x: -x[1])
+    supplies.sort(key=lambda x: -x[1])
+
+    movements = []
+    while withdrawals and supplies:
+        amount = min(withdrawals[0][1], supplies[0][1])
+        movements.append(MorphoAssetMovement(
+            from_market_id=withdrawals[0][0],
+            to_market_id=supplies[0][0],
+            amount=amount
+        ))
+        withdrawals[0][1] -= amount
+        supplies[0][1] -= amount
+        if withdrawals[0][1] < MIN_MOVE_AMOUNT:
+            withdrawals.pop(0)
+        if supplies[0][1] < MIN_MOVE_AMOUNT:
+            supplies.pop(0)
+
+    return movements
+
+def _weighted_apy(models: Dict[str, _MarketModel], allocations: Dict[str, int]) -> float:
+    total = sum(allocations.values())
+    if not total:
+        return 0.0
+    return sum(models[mid].yield_of(amount) for mid, amount in allocations.items()) / total
+
+def optimize_allocation(snapshot: VaultSnapshot, max_concentration: float = MAX_CONCENTRATION) -> ReallocationPlan:
+    """
+    Maximize the projected vault supply APY under the liquidity, supply cap and concentration constraints.
+
+    Every market starts at the minimum it must keep (what can't be withdrawn), then the remaining assets
+    are handed out in small increments to the market with the best marginal yield. The yield of a market
+    is concave in our allocation (more supply lowers utilization), so this greedy fill is optimal up to
+    the increment size.
+    """
+    total = snapshot.total_assets
+    models = {m.market_id: _MarketModel(m) for m in snapshot.markets}
+    bounds = _bounds(snapshot, max_concentration)
+    current = {m.market_id: m.allocation for m in snapshot.markets}
+
+    if sum(upper for _, upper in bounds.values()) < total:
+        raise ValueError("Supply caps and the concentration limit cannot absorb the vault assets")
+
+    target = {mid: lower for mid, (lower, _) in bounds.items()}
+    remaining = total - sum(target.values())
+    step = max(total // SOLVER_STEPS, 1)
+
+    while remaining > 0:
+        amount = min(step, remaining)
+        best_id, best_gain = None, None
+        for mid, model in models.items():
+            room = bounds[mid][1] - target[mid]
+            if room <= 0:
+                continue
+            increment = min(amount, room)
+            gain = (model.yield_of(target[mid] + increment) - model.yield_of(target[mid])) / increment
+            if best_gain is None or gain > best_gain:
+                best_id, best_gain = mid, gain
+
+        increment = min(amount, bounds[best_id][1] - target[best_id])
+        target[best_id] += increment
+        remaining -= increment
+
+    return ReallocationPlan(
+        movements=_to_movements(current, target),
+        target_allocations=target,
+        current_apy=_weighted_apy(models, current),
+        projected_apy=_weighted_apy(models, target)
+    )
+
+async def get_vault_snapshot() -> VaultSnapshot:
+    """Build a solver snapshot from the API and on-chain market state"""
+    vault = await MorphoAPIClient.get_vault_data(VAULT_ADDRESS)
+    markets = await get_morpho_markets()
+    markets_by_id = {m.id: m for m in markets}
+
+    snapshot = VaultSnapshot()
+    for allocation in vault.state.allocation:
+        market = markets_by_id.get(allocation.market["id"])
+        if not market:
+            continue
+
+        stats = await market_reader.get_market_data(market.uniqueKey)
+        snapshot.markets.append(MarketPosition(
+            market_id=market.uniqueKey,
+            name=f"{market.collateralAsset.symbol}-{market.loanAsset.symbol}",
+            allocation=allocation.supplyAssets,
+            supply_cap=allocation.supplyCap,
+            total_supply=stats['supply_assets'] if stats else market.state.supplyAssets,
+            total_borrow=stats['borrow_assets'] if stats else market.state.borrowAssets,
+            borrow_apy=market.state.borrowApy,
+            supply_apy=market.state.supplyApy
+        ))
+
+    return snapshot
+
+def format_plan(snapshot: VaultSnapshot, plan: ReallocationPlan) -> str:
+    """Format a reallocation plan for the LLM"""
+    names = {m.market_id: m.name for m in snapshot.markets}
+    response = [
+        f"Current APY: {plan.current_apy * 100:.2f}%",
+        f"Projected APY: {plan.projected_apy * 100:.2f}%",
+        "\nTarget allocations:"
+    ]
+    for market in snapshot.markets:
+        target = plan.target_allocations[market.market_id]
+        response.append(
+            f"- {market.name} ({market.market_id}): {market.allocation/1e6:,.2f} -> {target/1e6:,.2f} USDC"
+        )
+
+    if not plan.movements:
+        response.append("\nNo reallocation needed.")
+        return "\n".join(response)
+
+    response.append("\nReallocations (pass as-is to the reallocate tool):")
+    response.append(json.dumps([m.model_dump() for m in plan.movements]))
+    for m in plan.movements:
+        response.append(f"- {m.amount/1e6:,.2f} USDC: {names[m.from_market_id]} -> {names[m.to_market_id]}")
+
+    return "\n".join(response)
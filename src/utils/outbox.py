@@ -0,0 +1,236 @@
+""" Local durable outbox for Supabase writes """
+
+from typing import Awaitable, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    table_name TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL UNIQUE,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (table_name, next_attempt_at, id);
+CREATE TABLE IF NOT EXISTS outbox_dead (
+    id INTEGER PRIMARY KEY,
+    table_name TEXT NOT NULL,
+    idempotency_key TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    attempts INTEGER NOT NULL,
+    error TEXT,
+    failed_at REAL NOT NULL
+);
+"""
+
+class Outbox:
+    """
+    Every write lands in a local SQLite file first, a background shipper sends
+    the rows to Supabase in batches per table.
+
+    Each row carries an `idempotency_key`, and batches are upserted ignoring
+    duplicates on it, so a batch that was stored but whose response was lost
+    can be resent safely. Failed batches are retried with exponential backoff;
+    a database outage only delays replication.
+
+    A retried batch is halved at each attempt, so a row the database rejects ends
+    up shipped alone and stops holding back the rows behind it. After `max_attempts`
+    it is moved to `outbox_dead`, unless the whole table is failing (an outage).
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ship: Callable[[str, List[Dict]], Awaitable],
+        batch_size: int = 100,
+        flush_interval: float = 2.0,
+        base_backoff: float = 1.0,
+        max_backoff: float = 300.0,
+        max_attempts: int = 8
+    ):
+        self.path = path
+        self.ship = ship
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self.max_attempts = max_attempts
+
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.executescript(SCHEMA)
+        self.db_lock = threading.Lock()
+
+        # Queued rows per table, counted once here and kept up to date in memory
+        self.depths: Dict[str, int] = dict(self._execute("SELECT table_name, COUNT(*) FROM outbox GROUP BY table_name"))
+
+        self.wakeup = asyncio.Event()
+        self.shipper_task: Optional[asyncio.Task] = None
+
+        # Metrics, per table
+        self.shipped_rows: Dict[str, int] = {}
+        self.failed_batches: Dict[str, int] = {}
+        self.dead_rows: Dict[str, int] = {}
+        self.last_ship_latency: Dict[str, float] = {}
+        self.last_success: Dict[str, float] = {}
+
+    def _execute(self, query: str, params: tuple = ()) -> List[tuple]:
+        with self.db_lock:
+            rows = self.db.execute(query, params).fetchall()
+            self.db.commit()
+            return rows
+
+    def _insert(self, table: str, key: str, payload: str, now: float) -> int:
+        with self.db_lock:
+            inserted = self.db.execute(
+                "INSERT OR IGNORE INTO outbox (table_name, idempotency_key, payload, created_at, next_attempt_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (table, key, payload, now, now)
+            ).rowcount
+            self.db.commit()
+            return inserted
+
+    def _remove(self, table: str, count: int):
+        self.depths[table] = max(self.depths.get(table, 0) - count, 0)
+
+    async def enqueue(self, table: str, row: Dict, idempotency_key: Optional[str] = None) -> str:
+        """Durably queue a row for `table`, returns its idempotency key"""
+        key = idempotency_key or str(uuid.uuid4())
+        payload = json.dumps({**row, "idempotency_key": key}, default=str)
+
+        # A key already queued is ignored
+        inserted = await asyncio.to_thread(self._insert, table, key, payload, time.time())
+        self.depths[table] = self.depths.get(table, 0) + inserted
+
+        if self.depths[table] >= self.batch_size:
+            self.wakeup.set()
+        return key
+
+    def pending_count(self, table: Optional[str] = None) -> int:
+        if table:
+            return self.depths.get(table, 0)
+        return sum(self.depths.values())
+
+    def start(self):
+        if self.shipper_task is None:
+            self.shipper_task = asyncio.create_task(self._ship_loop())
+            logger.info(f"Outbox shipper started ({self.pending_count()} rows pending)")
+
+    async def stop(self, timeout: float = 5.0):
+        """Stop the shipper, with a last attempt to ship what is due. Rows left stay on disk."""
+        if self.shipper_task:
+            self.shipper_task.cancel()
+            await asyncio.gather(self.shipper_task, return_exceptions=True)
+            self.shipper_task = None
+        try:
+            await asyncio.wait_for(self.ship_due(), timeout=timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Outbox: {self.pending_count()} rows left for the next start")
+
+    async def _ship_loop(self):
+        while True:
+            try:
+                await asyncio.wait_for(self.wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self.wakeup.clear()
+
+            try:
+                await self.ship_due()
+            except Exception as e:
+                logger.error(f"Outbox shipper error: {str(e)}")
+
+    async def ship_due(self):
+        """Ship every due row, batched per table"""
+        tables = [r[0] for r in await asyncio.to_thread(
+            self._execute,
+            "SELECT DISTINCT table_name FROM outbox WHERE next_attempt_at <= ?",
+            (time.time(),)
+        )]
+
+        for table in tables:
+            while await self._ship_batch(table):
+                pass
+
+    async def _ship_batch(self, table: str) -> bool:
+        """Ship one batch, returns whether there may be more due rows"""
+        rows = await asyncio.to_thread(
+            self._execute,
+            "SELECT id, payload, attempts FROM outbox WHERE table_name = ? AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+            (table, time.time(), self.batch_size)
+        )
+        if not rows:
+            return False
+
+        # Rows that failed before go in smaller batches, down to a single row
+        rows = rows[:max(1, self.batch_size >> max(r[2] for r in rows))]
+        ids = [r[0] for r in rows]
+        placeholders = ",".join("?" * len(ids))
+        started = time.time()
+
+        try:
+            await self.ship(table, [json.loads(r[1]) for r in rows])
+        except Exception as e:
+            attempts = max(r[2] for r in rows) + 1
+            # Rejected alone while other rows of the table get through: park it
+            table_healthy = time.time() - self.last_success.get(table, 0) < 2 * self.max_backoff
+            if len(rows) == 1 and attempts >= self.max_attempts and table_healthy:
+                await asyncio.to_thread(self._dead_letter, ids[0], attempts, str(e))
+                self._remove(table, 1)
+                self.dead_rows[table] = self.dead_rows.get(table, 0) + 1
+                logger.error(f"Outbox: row {ids[0]} for {table} failed {attempts} times, moved to outbox_dead: {e}")
+                return True
+
+            backoff = min(self.base_backoff * 2 ** attempts, self.max_backoff)
+            await asyncio.to_thread(
+                self._execute,
+                f"UPDATE outbox SET attempts = attempts + 1, next_attempt_at = ? WHERE id IN ({placeholders})",
+                (time.time() + backoff, *ids)
+            )
+            self.failed_batches[table] = self.failed_batches.get(table, 0) + 1
+            logger.error(f"Outbox: shipping {len(ids)} rows to {table} failed, retry in {backoff:.0f}s: {e}")
+            return False
+
+        await asyncio.to_thread(self._execute, f"DELETE FROM outbox WHERE id IN ({placeholders})", tuple(ids))
+        self._remove(table, len(ids))
+        self.shipped_rows[table] = self.shipped_rows.get(table, 0) + len(ids)
+        self.last_ship_latency[table] = time.time() - started
+        self.last_success[table] = time.time()
+        return True
+
+    def _dead_letter(self, row_id: int, attempts: int, error: str):
+        with self.db_lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO outbox_dead "
+                "SELECT id, table_name, idempotency_key, payload, created_at, ?, ?, ? FROM outbox WHERE id = ?",
+                (attempts, error, time.time(), row_id)
+            )
+            self.db.execute("DELETE FROM outbox WHERE id = ?", (row_id,))
+            self.db.commit()
+
+    def metrics(self) -> Dict[str, Dict]:
+        tables = set(self.depths) | set(self.shipped_rows) | set(self.failed_batches) | set(self.dead_rows)
+        return {
+            table: {
+                "depth": self.depths.get(table, 0),
+                "shipped_rows": self.shipped_rows.get(table, 0),
+                "failed_batches": self.failed_batches.get(table, 0),
+                "dead_rows": self.dead_rows.get(table, 0),
+                "last_ship_latency": self.last_ship_latency.get(table),
+            }
+            for table in tables
+        }
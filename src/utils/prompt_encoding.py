@@ -0,0 +1,54 @@
+""" Compact, token-budgeted encoding of market data for LLM prompts """
+
+from typing import Dict, List, Optional, Sequence
+
+# USDC has 6 decimals, amounts are shown in thousands of USDC
+USDC_K = 1e9
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, about 4 characters per token"""
+    return len(text) // 4 + 1
+
+def usdc_k(amount: float) -> str:
+    """Raw USDC amount as thousands of USDC"""
+    return f"{amount / USDC_K:,.1f}"
+
+def pct(value: Optional[float]) -> str:
+    """A value already in percent, '-' when unknown"""
+    return f"{value:.2f}" if value is not None else "-"
+
+def short_id(market_id: str) -> str:
+    """First 8 hex digits of a market id, enough to tell vault markets apart"""
+    return market_id.lower().replace('0x', '')[:8]
+
+def split_budget(total: int, **weights: float) -> Dict[str, int]:
+    """Share a token budget between prompt sections, proportionally to their weight"""
+    weight_sum = sum(weights.values())
+    return {name: int(total * weight / weight_sum) for name, weight in weights.items()}
+
+def encode_table(
+    columns: Sequence[str],
+    rows: List[Sequence[str]],
+    scores: Optional[List[float]] = None,
+    max_tokens: Optional[int] = None
+) -> str:
+    """
+    Pipe-separated table, one line per row.
+
+    With a token budget, rows are ranked by `scores` (highest first) and the table
+    is cut once the budget is reached, noting how many rows were left out.
+    """
+    if scores is not None:
+        rows = [row for _, row in sorted(zip(scores, rows), key=lambda pair: -pair[0])]
+
+    lines = ["|".join(columns)]
+    tokens = estimate_tokens(lines[0])
+    for i, row in enumerate(rows):
+        line = "|".join(row)
+        if max_tokens is not None and tokens + estimate_tokens(line) > max_tokens:
+            lines.append(f"(+{len(rows) - i} rows omitted)")
+            break
+        lines.append(line)
+        tokens += estimate_tokens(line)
+
+    return "\n".join(lines)
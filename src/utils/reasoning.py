@@ -2,20 +2,29 @@ from langchain_core.tools import tool
 from config import Config
 from langchain_core.messages import HumanMessage, SystemMessage
 from utils.supabase import SupabaseClient
-from utils.activity_types import REASONING_STARTED, REASONING_COMPLETED
+from utils.activity_types import REASONING_STARTED, REASONING_DELTA, REASONING_COMPLETED
 
 from langgraph.prebuilt import create_react_agent
-from .model_util import get_llm
+from .model_util import get_llm, Priority
+from .llm_cache import llm_cache_store
+from .deadline import time_bounded
 
 import logging
 import time
+import uuid
 
 # Get the standard Python logger
 logger = logging.getLogger(__name__)
 
-# use smarter model for reasoning
-# for cost saving, we use the interpreter model
-llm = get_llm(Config.MODEL_TYPE, is_interpreter=True)
+# Partial reasoning is broadcast at most this often, or once this many characters are pending
+DELTA_INTERVAL = 0.25  # seconds
+DELTA_MIN_CHARS = 80
+
+def _chunk_text(chunk) -> str:
+    """Text of a streamed chunk, Anthropic streams a list of content blocks"""
+    if isinstance(chunk.content, str):
+        return chunk.content
+    return "".join(block.get("text", "") for block in chunk.content if isinstance(block, dict))
 
 prompt = """You are a DeFi expert in lending protocols.
 Your job is to reason about the prompt and the data, and provide a detailed analysis.
@@ -40,10 +49,15 @@ Basic Knoledge about Morpho Markets:
 
 """
 
-def create_reasoning_tool(agent):
-    """Create reasoning tool with agent access for broadcasting"""
+def create_reasoning_tool(agent, priority: Priority):
+    """Create reasoning tool with agent access for broadcasting, its LLM calls keep the graph's priority"""
+
+    # use smarter model for reasoning
+    # for cost saving, we use the interpreter model
+    llm = get_llm(Config.MODEL_TYPE, is_interpreter=True, priority=priority)
     
     @tool
+    @time_bounded(Config.LLM_CALL_TIMEOUT)
     async def market_analysis(reasoning_prompt: str, market_or_vault_data: str, activity_id: str):
         """
         Giving the data and current stats, conduct a thorough reasoing about the prompt related to market analysis.
@@ -61,9 +75,12 @@ def create_reasoning_tool(agent):
             market_or_vault_data: The data you gather from other tools, including market apys, volumn changes and current liquidity.
         """
 
+        reasoning_id = str(uuid.uuid4())
+
         # Broadcast that we're starting reasoning with more details
         if agent and agent.ws_manager:
             await agent.broadcast_activity(REASONING_STARTED, {
+                "reasoning_id": reasoning_id,
                 "prompt": reasoning_prompt,
                 "timestamp": time.time()
             })
@@ -74,19 +91,61 @@ def create_reasoning_tool(agent):
         Data:
         {market_or_vault_data}
         """
-        
-        response = llm.invoke([
+
+        # Same question on the same data and vault state: reuse the earlier analysis
+        cache_key = llm_cache_store.key("market_analysis", prompt, final_message)
+        cached = llm_cache_store.get_text(cache_key)
+        if cached is not None:
+            if agent and agent.ws_manager:
+                await agent.broadcast_activity(REASONING_COMPLETED, {
+                    "reasoning_id": reasoning_id,
+                    "text": cached,
+                    "cached": True,
+                    "timestamp": time.time()
+                })
+            return cached
+
+        # Stream the reasoning, clients get partial text as it is generated
+        parts = []
+        pending = ""
+        last_sent = time.time()
+        seq = 0
+        async for chunk in llm.astream([
             SystemMessage(content=prompt),
             HumanMessage(content=final_message)
-        ])
+        ]):
+            text = _chunk_text(chunk)
+            parts.append(text)
+            pending += text
+
+            if agent and agent.ws_manager and pending and (
+                len(pending) >= DELTA_MIN_CHARS or time.time() - last_sent >= DELTA_INTERVAL
+            ):
+                await agent.broadcast_activity(REASONING_DELTA, {
+                    "reasoning_id": reasoning_id,
+                    "seq": seq,
+                    "delta": pending
+                })
+                seq += 1
+                pending = ""
+                last_sent = time.time()
+
+        if agent and agent.ws_manager and pending:
+            await agent.broadcast_activity(REASONING_DELTA, {
+                "reasoning_id": reasoning_id,
+                "seq": seq,
+                "delta": pending
+            })
 
-        reasoning = response.content
+        reasoning = "".join(parts)
+        llm_cache_store.put_text(cache_key, reasoning, Config.LLM_CACHE_TTL)
 
         await SupabaseClient.store_thought("analysis", reasoning, activity_id)
 
         # Broadcast that we've completed reasoning with the actual content
         if agent and agent.ws_manager:
             await agent.broadcast_activity(REASONING_COMPLETED, {
+                "reasoning_id": reasoning_id,
                 "text": reasoning,
                 "timestamp": time.time()
             })
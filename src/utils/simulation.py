@@ -0,0 +1,145 @@
+""" Pre-flight simulation of vault transactions with eth_call """
+
+from typing import Dict, Optional
+from eth_abi import decode
+from pydantic import BaseModel
+from web3 import Web3
+from web3.exceptions import ContractLogicError
+import logging
+
+logger = logging.getLogger(__name__)
+
+LIQUIDITY_ERRORS = {"insufficient liquidity", "NotEnoughLiquidity"}
+
+ERROR_STRING_SELECTOR = "08c379a0"  # Error(string)
+PANIC_SELECTOR = "4e487b71"  # Panic(uint256)
+
+# Human readable explanation for the errors the LLM is most likely to hit
+REVERT_REASONS = {
+    "NotEnoughLiquidity": "the vault cannot withdraw that much from the market",
+    "insufficient liquidity": "a withdrawal exceeds the available liquidity of the market",
+    "InconsistentReallocation": "total withdrawn does not match total supplied",
+    "SupplyCapExceeded": "the new allocation is above the market supply cap",
+    "MarketNotEnabled": "the market is not enabled in the vault",
+    "UnauthorizedMarket": "the market is not part of the vault",
+    "NotAllocatorRole": "the agent wallet is not an allocator of the vault",
+    "market not created": "the market params do not match a created market",
+    "inconsistent input": "assets and shares were both zero or both set",
+}
+
+class ReallocationRevert(BaseModel):
+    """Decoded revert of a simulated reallocation"""
+    error: str
+    reason: str
+    market_id: Optional[str] = None
+    raw: str = ""
+
+    def describe(self) -> str:
+        market = f" (market {self.market_id})" if self.market_id else ""
+        return f"{self.error}{market}: {self.reason}"
+
+def _build_error_selectors(abi: list) -> Dict[str, dict]:
+    """Map 4-byte selectors to the custom errors declared in the ABI"""
+    selectors = {}
+    for entry in abi:
+        if entry.get("type") != "error":
+            continue
+        types = [i["type"] for i in entry["inputs"]]
+        signature = f"{entry['name']}({','.join(types)})"
+        selectors[Web3.keccak(text=signature)[:4].hex()] = {
+            "name": entry["name"],
+            "types": types,
+            "names": [i["name"] for i in entry["inputs"]],
+        }
+    return selectors
+
+def decode_revert(revert_data: str, error_selectors: Dict[str, dict]) -> ReallocationRevert:
+    """Decode raw revert data into a structured error"""
+    data = (revert_data or "").lower()
+    if data.startswith("0x"):
+        data = data[2:]
+
+    selector, payload = data[:8], bytes.fromhex(data[8:]) if len(data) > 8 else b""
+
+    if selector == ERROR_STRING_SELECTOR:
+        message = decode(["string"], payload)[0]
+        return ReallocationRevert(
+            error=message,
+            reason=REVERT_REASONS.get(message, message),
+            raw=revert_data
+        )
+
+    if selector == PANIC_SELECTOR:
+        code = decode(["uint256"], payload)[0]
+        return ReallocationRevert(error="Panic", reason=f"panic code {hex(code)}", raw=revert_data)
+
+    custom = error_selectors.get(selector)
+    if custom:
+        args = dict(zip(custom["names"], decode(custom["types"], payload))) if custom["types"] else {}
+        market_id = args.get("id")
+        return ReallocationRevert(
+            error=custom["name"],
+            reason=REVERT_REASONS.get(custom["name"], custom["name"]),
+            market_id="0x" + market_id.hex() if isinstance(market_id, bytes) else None,
+            raw=revert_data
+        )
+
+    return ReallocationRevert(error="Unknown", reason="unrecognized revert data", raw=revert_data)
+
+class ReallocationSimulator:
+    """Runs reallocation calldata through eth_call before it is sent on-chain"""
+
+    def __init__(self, web3: Web3, vault_address: str, vault_abi: list, market_reader=None):
+        self.web3 = web3
+        self.vault_address = Web3.to_checksum_address(vault_address)
+        self.market_reader = market_reader
+        self.error_selectors = _build_error_selectors(vault_abi)
+
+    def simulate(self, sender: str, calldata: bytes, withdrawals: Dict[str, int] = None) -> Optional[ReallocationRevert]:
+        """
+        Simulate the call against the pending block.
+
+        Returns None if the call would succeed, otherwise the decoded revert.
+        `withdrawals` (market_id -> amount) is used to pin liquidity errors to a market.
+        """
+        try:
+            self.web3.eth.call({
+                "from": Web3.to_checksum_address(sender),
+                "to": self.vault_address,
+                "data": "0x" + calldata.hex(),
+            }, "pending")
+            return None
+        except ContractLogicError as e:
+            revert_data = e.data if isinstance(e.data, str) else ""
+            if revert_data:
+                revert = decode_revert(revert_data, self.error_selectors)
+            else:
+                revert = ReallocationRevert(error="Reverted", reason=str(e.message or e))
+
+            if revert.market_id is None and revert.error in LIQUIDITY_ERRORS and withdrawals:
+                revert.market_id = self._find_illiquid_market(withdrawals)
+
+            logger.info(f"Reallocation simulation reverted: {revert.describe()}")
+            return revert
+
+    def _find_illiquid_market(self, withdrawals: Dict[str, int]) -> Optional[str]:
+        """Find the first market whose requested withdrawal is above its liquidity"""
+        if not self.market_reader:
+            return None
+
+        for market_id, amount in withdrawals.items():
+            try:
+                market = self.market_reader.morpho.functions.market(market_id).call()
+                liquidity = int(market[0]) - int(market[2])
+                if amount > liquidity:
+                    return market_id
+            except Exception as e:
+                logger.warning(f"Could not read liquidity for {market_id}: {e}")
+
+        return None
+
+def withdrawal_amounts(deltas: Dict[str, int]) -> Dict[str, int]:
+    """Withdrawal amounts (positive) from a market_id -> delta mapping"""
+    return {market_id: -delta for market_id, delta in deltas.items() if delta < 0}
+
+__all__ = ['ReallocationRevert', 'ReallocationSimulator', 'decode_revert', 'withdrawal_amounts']
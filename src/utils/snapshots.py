@@ -0,0 +1,82 @@
+""" Latest vault, market and risk snapshots, for answers that must not wait on the network """
+
+from typing import Any, Dict, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from .constants import VAULT_ADDRESS
+from .market import get_morpho_markets, get_vault_allocations_summary
+from .market_api import MorphoAPIClient
+from .prompt_encoding import encode_table, pct, short_id, usdc_k
+
+logger = logging.getLogger(__name__)
+
+# Snapshot names
+VAULT = "vault"
+ALLOCATIONS = "allocations"
+MARKETS = "markets"
+LAST_RISK = "last_risk"
+LAST_REALLOCATION = "last_reallocation"
+
+class SnapshotStore:
+    """
+    Last value recorded under each name, with its time.
+
+    Readers never fetch: the market snapshots are refreshed by a scheduled job
+    (`refresh_market_snapshots`), the others are recorded by whoever produces them.
+    """
+
+    def __init__(self):
+        self.values: Dict[str, Tuple[float, Any]] = {}
+
+    def record(self, name: str, value: Any):
+        self.values[name] = (time.time(), value)
+
+    def get(self, name: str) -> Optional[Tuple[Any, float]]:
+        """Value and age in seconds, None if nothing was recorded yet"""
+        if name not in self.values:
+            return None
+        recorded_at, value = self.values[name]
+        return value, time.time() - recorded_at
+
+snapshots = SnapshotStore()
+
+async def refresh_market_snapshots():
+    """Fetch the vault, its allocations and the market list, and record them"""
+    vault, markets, allocations = await asyncio.gather(
+        MorphoAPIClient.get_vault_data(VAULT_ADDRESS),
+        get_morpho_markets(),
+        get_vault_allocations_summary()
+    )
+    if not vault:
+        logger.warning("Snapshots: no vault data")
+        return
+
+    snapshots.record(VAULT, {
+        "tvl_usd": vault.state.totalAssetsUsd,
+        "apy": vault.state.apy,
+        "all_time_apy": vault.state.allTimeApy,
+        "markets": len(vault.state.allocation),
+    })
+    snapshots.record(ALLOCATIONS, allocations)
+
+    supplied = {alloc.market["id"]: alloc.supplyAssets for alloc in vault.state.allocation}
+    vault_markets = [m for m in markets if m.id in supplied]
+    snapshots.record(MARKETS, "Vault markets, amounts in thousands of USDC:\n" + encode_table(
+        ("market", "id", "supply_k", "util%", "supply_apy%", "borrow_apy%"),
+        [
+            (
+                f"{m.collateralAsset.symbol}-{m.loanAsset.symbol}",
+                short_id(m.uniqueKey),
+                usdc_k(supplied[m.id]),
+                pct(m.state.utilization * 100),
+                pct(m.state.supplyApy * 100),
+                pct(m.state.borrowApy * 100)
+            )
+            for m in vault_markets
+        ],
+        [supplied[m.id] for m in vault_markets]
+    ))
+
+__all__ = ['snapshots', 'refresh_market_snapshots']
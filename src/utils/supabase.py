@@ -1,13 +1,35 @@
 import os
-from supabase import create_client, Client
-from typing import Optional, Dict
+import asyncio
+from supabase import acreate_client, AsyncClient
+from typing import AsyncIterator, Optional, Dict, List
 from datetime import datetime, timedelta, timezone
+from config import Config
+from .outbox import Outbox
+from .activity_history import ActivityHistoryEncoder, HISTORY_ENCODING, decode_entries
 
 class SupabaseClient:
-    _instance: Optional[Client] = None
+    """
+    Async Supabase access. A single AsyncClient is shared by the whole process,
+    so every call reuses the same HTTP connection pool and never blocks the event loop.
+
+    Writes go to a local outbox first and are shipped in the background, so a
+    Supabase outage or slow request never fails or delays the caller.
+    """
+    _instance: Optional[AsyncClient] = None
+    _init_lock = asyncio.Lock()
+    _outbox: Optional[Outbox] = None
+
+    # Upsert conflict target per table, rows with an existing key are skipped
+    _conflict_keys = {'onchain-events': 'tx_hash,log_index', 'activity-blobs': 'hash'}
+
+    # Creation time column per table, stamped when a row is queued (not when it is shipped)
+    _time_columns = {'market-snapshots': 'timestamp'}
+
+    # Activities only store what their thread did not store yet
+    _history_encoder = ActivityHistoryEncoder()
 
     @classmethod
-    def init(cls):
+    async def init(cls):
         """Initialize Supabase client"""
         supabase_url = os.getenv("SUPABASE_URL")
         supabase_key = os.getenv("SUPABASE_KEY")
@@ -15,27 +37,75 @@ class SupabaseClient:
         if not supabase_url or not supabase_key:
             raise ValueError("SUPABASE_URL and SUPABASE_KEY environment variables must be set")
         
-        cls._instance = create_client(supabase_url, supabase_key)
+        cls._instance = await acreate_client(supabase_url, supabase_key)
+        cls._get_outbox()
         return cls._instance
 
     @classmethod
-    def get_client(cls) -> Client:
+    async def get_client(cls) -> AsyncClient:
         """Get Supabase client instance"""
         if not cls._instance:
-            cls._instance = cls.init()
+            async with cls._init_lock:
+                if not cls._instance:
+                    await cls.init()
         return cls._instance
 
     @classmethod
-    async def _store_data(cls, table: str, data: Dict, error_context: str):
-        """Base method to store data in any table"""
+    async def close(cls):
+        """Ship pending writes and close the shared HTTP connections"""
+        if cls._outbox:
+            await cls._outbox.stop()
+
+        if cls._instance:
+            await cls._instance.postgrest.aclose()
+            cls._instance = None
+
+    @classmethod
+    def _get_outbox(cls) -> Outbox:
+        if cls._outbox is None:
+            cls._outbox = Outbox(
+                Config.OUTBOX_PATH,
+                cls._insert_rows,
+                batch_size=Config.OUTBOX_BATCH_SIZE,
+                flush_interval=Config.OUTBOX_FLUSH_INTERVAL,
+                max_backoff=Config.OUTBOX_MAX_BACKOFF,
+                max_attempts=Config.OUTBOX_MAX_ATTEMPTS
+            )
+            cls._outbox.start()
+        return cls._outbox
+
+    @classmethod
+    async def _store_data(cls, table: str, data: Dict, error_context: str, idempotency_key: Optional[str] = None):
+        """Base method to store data in any table, queued in the outbox"""
         try:
-            client = cls.get_client()
-            result = client.table(table).insert(data).execute()
-            return result
+            # Rows shipped after an outage keep the time they were created at
+            data = {cls._time_columns.get(table, 'created_at'): datetime.now(timezone.utc).isoformat(), **data}
+            return await cls._get_outbox().enqueue(table, data, idempotency_key)
         except Exception as e:
             print(f"Error storing {error_context}: {e}")
             raise
 
+    @classmethod
+    async def _insert_rows(cls, table: str, rows: List[Dict]):
+        """Bulk insert shipped by the outbox, rows already stored are skipped"""
+        client = await cls.get_client()
+        return await client.table(table) \
+            .upsert(rows, on_conflict=cls._conflict_keys.get(table, 'idempotency_key'), ignore_duplicates=True) \
+            .execute()
+
+    @classmethod
+    async def flush(cls, timeout: float = 10.0):
+        """Ship what the outbox holds now, e.g. before reading tables derived from it"""
+        try:
+            await asyncio.wait_for(cls._get_outbox().ship_due(), timeout=timeout)
+        except asyncio.TimeoutError:
+            print("Outbox flush timed out, some rows are not in the database yet")
+
+    @classmethod
+    def buffer_metrics(cls) -> Dict[str, Dict]:
+        """Outbox depth and ship latency per table"""
+        return cls._outbox.metrics() if cls._outbox else {}
+
     @classmethod
     async def _store_memory_table(cls, memory_type: str, sub_type: str, text: str, activity_id: str):
         """Base method to store data in the memories table, most information is stored here"""
@@ -54,12 +124,13 @@ class SupabaseClient:
 
     @classmethod
     async def store_onchain_events(cls, data: dict):
-        """Store onchain events"""
-        return await cls._store_data('onchain-events', data, "onchain event")
+        """Store onchain event in the onchain-events table, a log is only stored once"""
+        key = f"{data['tx_hash']}:{data['log_index']}" if data.get('log_index') is not None else None
+        return await cls._store_data('onchain-events', data, "onchain event", key)
 
     @classmethod
     async def store_market_snapshot(cls, data: dict):
-        """Store market snapshot"""
+        """Store market snapshot in the market-snapshots table"""
         return await cls._store_data('market-snapshots', data, "market snapshot")
 
     @classmethod
@@ -73,46 +144,179 @@ class SupabaseClient:
         return await cls._store_memory_table("report", sub_type, text, activity_id)
 
     @classmethod
-    async def store_activity(cls, activity_id: str, full_history: list, trigger: str):
-        """Store activity with full message history"""
-        # Convert messages to serializable format
-        serializable_history = []
-        for message in full_history:
-            serializable_history.append({
-                "type": message.__class__.__name__,
-                "content": message.content,
-                "additional_kwargs": message.additional_kwargs
-            })
-            
+    async def store_activity(
+        cls,
+        activity_id: str,
+        full_history: list,
+        trigger: str,
+        thread_id: Optional[str] = None,
+        tool_stats: Optional[Dict] = None
+    ):
+        """
+        Store the messages new to this activity, large contents go to activity-blobs once.
+        Pass `thread_id` only for checkpointed threads, other runs are stored standalone.
+        """
+        entries, blobs, parent_activity_id = cls._history_encoder.encode(activity_id, thread_id, full_history)
+
+        for blob in blobs:
+            await cls._store_data('activity-blobs', blob, "activity blob", blob['hash'])
+
         data = {
             "id": activity_id,
-            "full_history": serializable_history,
+            "full_history": entries,
+            "history_encoding": HISTORY_ENCODING,
+            "parent_activity_id": parent_activity_id,
+            "tool_stats": tool_stats,
             "trigger": trigger
         }
         return await cls._store_data('activities', data, "activity")
 
     @classmethod
-    async def get_filtered_market_events(cls, hours_ago: int = 1):
-        """Get filtered events from the last N hours"""
+    async def get_activity_history(cls, activity_id: str) -> Optional[List[Dict]]:
+        """Rebuild the full message history of an activity from its thread deltas"""
         try:
-            client = cls.get_client()
-            
-            # Calculate time range with explicit timezone
-            end_time = datetime.now(timezone.utc)
-            start_time = end_time - timedelta(hours=hours_ago)
-            
-            # Format timestamps to match exactly how they're stored
-            start_str = start_time.strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
-            end_str = end_time.strftime('%Y-%m-%dT%H:%M:%S.%f+00:00')
-            
-            response = client.table('onchain-events') \
-                .select('*') \
-                .gte('created_at', start_str) \
-                .lte('created_at', end_str) \
-                .execute()
-            
+            client = await cls.get_client()
+            chain = []
+            next_id = activity_id
+
+            while next_id:
+                response = await client.table('activities') \
+                    .select('id,full_history,history_encoding,parent_activity_id') \
+                    .eq('id', next_id) \
+                    .execute()
+                if not response.data:
+                    break
+                activity = response.data[0]
+                chain.append(activity['full_history'])
+                next_id = activity['parent_activity_id'] if activity['history_encoding'] == HISTORY_ENCODING else None
+
+            entries = [entry for history in reversed(chain) for entry in history]
+            hashes = list({entry['content_ref'] for entry in entries if 'content_ref' in entry})
+            blobs = {}
+            if hashes:
+                response = await client.table('activity-blobs') \
+                    .select('hash,data') \
+                    .in_('hash', hashes) \
+                    .execute()
+                blobs = {row['hash']: row['data'] for row in response.data}
+
+            return decode_entries(entries, blobs)
+
+        except Exception as e:
+            print(f"Error fetching activity history: {str(e)}")
+            return None
+
+    @classmethod
+    async def get_market_flow_rollup(cls, start_time: datetime, end_time: Optional[datetime] = None):
+        """Get per-market flow totals summed from the per-minute rollup table"""
+        try:
+            client = await cls.get_client()
+            end_time = end_time or datetime.now(timezone.utc)
+
+            response = await client.rpc('get_market_flow_rollup', {
+                'start_time': start_time.isoformat(),
+                'end_time': end_time.isoformat()
+            }).execute()
+
             return response.data
 
+        except Exception as e:
+            print(f"Error fetching market flow rollup: {str(e)}")
+            return None
+
+    @classmethod
+    async def get_latest_event_block(cls) -> Optional[int]:
+        """Highest block of the stored onchain events, None if unknown"""
+        try:
+            client = await cls.get_client()
+            response = await client.table('onchain-events') \
+                .select('block_number') \
+                .not_.is_('block_number', 'null') \
+                .order('block_number', desc=True) \
+                .limit(1) \
+                .execute()
+
+            return response.data[0]['block_number'] if response.data else None
+
+        except Exception as e:
+            print(f"Error fetching latest event block: {str(e)}")
+            return None
+
+    @classmethod
+    async def get_flow_rollup_buckets(cls, start_time: datetime, page_size: int = 1000):
+        """Get all per-minute rollup buckets since start_time"""
+        try:
+            client = await cls.get_client()
+            buckets = []
+
+            while True:
+                response = await client.table('market-flow-rollups') \
+                    .select('*') \
+                    .gte('bucket', start_time.isoformat()) \
+                    .order('bucket') \
+                    .order('market') \
+                    .range(len(buckets), len(buckets) + page_size - 1) \
+                    .execute()
+
+                buckets.extend(response.data)
+                if len(response.data) < page_size:
+                    return buckets
+
+        except Exception as e:
+            print(f"Error fetching flow rollup buckets: {str(e)}")
+            return None
+
+    @classmethod
+    async def stream_market_events(
+        cls,
+        start_time: datetime,
+        end_time: Optional[datetime] = None,
+        columns: str = 'id,created_at,market,event,amount',
+        page_size: int = 1000
+    ) -> AsyncIterator[Dict]:
+        """
+        Yield onchain events of a time range in (created_at, id) order, one page in memory at a time.
+        Pages are fetched by keyset: each one starts after the last (created_at, id) returned.
+        """
+        client = await cls.get_client()
+        end_time = end_time or datetime.now(timezone.utc)
+        last = None
+
+        while True:
+            query = client.table('onchain-events') \
+                .select(columns) \
+                .lte('created_at', end_time.isoformat())
+
+            if last is None:
+                query = query.gte('created_at', start_time.isoformat())
+            else:
+                created_at, row_id = last
+                query = query.or_(
+                    f'created_at.gt."{created_at}",and(created_at.eq."{created_at}",id.gt.{row_id})'
+                )
+
+            response = await query \
+                .order('created_at') \
+                .order('id') \
+                .limit(page_size) \
+                .execute()
+
+            for row in response.data:
+                yield row
+
+            if len(response.data) < page_size:
+                return
+            last = (response.data[-1]['created_at'], response.data[-1]['id'])
+
+    @classmethod
+    async def get_filtered_market_events(cls, hours_ago: int = 1) -> AsyncIterator[Dict]:
+        """Yield events from the last N hours, one page in memory at a time"""
+        end_time = datetime.now(timezone.utc)
+        start_time = end_time - timedelta(hours=hours_ago)
+
+        try:
+            async for event in cls.stream_market_events(start_time, end_time, columns='*'):
+                yield event
+
         except Exception as e:
             print(f"Error fetching filtered events: {str(e)}")
-            return None
\ No newline at end of file
@@ -0,0 +1,91 @@
+""" Run-scoped memoization of tool results """
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, Optional
+import asyncio
+import json
+import logging
+
+from .market import web3
+
+logger = logging.getLogger(__name__)
+
+class ToolMemo:
+    """
+    Tool results of one graph invocation, keyed by tool, arguments and block height.
+
+    The block height is read once, at the first tool call of the run, so repeated
+    calls return the same snapshot instantly. A state-changing action calls
+    `invalidate()`, the next call then reads a new block and fetches again.
+    """
+
+    def __init__(self):
+        self.results: Dict[tuple, str] = {}
+        self.block_number: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+
+    async def _block(self) -> Optional[int]:
+        if self.block_number is None:
+            try:
+                self.block_number = await asyncio.to_thread(lambda: web3.eth.block_number)
+            except Exception as e:
+                logger.warning(f"Tool memo: could not read block number: {str(e)}")
+        return self.block_number
+
+    async def key(self, tool_name: str, kwargs: dict) -> tuple:
+        return (tool_name, json.dumps(kwargs, sort_keys=True, default=str), await self._block())
+
+    def invalidate(self):
+        self.results.clear()
+        self.block_number = None
+
+    def stats(self) -> dict:
+        calls = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / calls if calls else 0.0
+        }
+
+_current_memo: ContextVar[Optional[ToolMemo]] = ContextVar("tool_memo", default=None)
+
+@contextmanager
+def tool_memo_scope():
+    """Memoize tool calls made inside this block, e.g. around a graph `ainvoke`"""
+    memo = ToolMemo()
+    token = _current_memo.set(memo)
+    try:
+        yield memo
+    finally:
+        _current_memo.reset(token)
+
+def invalidate_tool_memo():
+    """Drop the results of the current run, after an action changed onchain state"""
+    memo = _current_memo.get()
+    if memo:
+        memo.invalidate()
+
+def memoized(func):
+    """Return the result of an identical earlier call in the same run (see tool_memo_scope)"""
+    @wraps(func)
+    async def wrapper(**kwargs):
+        memo = _current_memo.get()
+        if memo is None:
+            return await func(**kwargs)
+
+        key = await memo.key(func.__name__, kwargs)
+        if key in memo.results:
+            memo.hits += 1
+            return memo.results[key]
+
+        memo.misses += 1
+        result = await func(**kwargs)
+        # Errors are not memoized, the agent may retry
+        if not result.startswith("Error"):
+            memo.results[key] = result
+        return result
+
+    return wrapper
@@ -0,0 +1,6 @@
+-- Index for per-market scans of "onchain-events" over a time window.
+-- Window totals are aggregated in SQL by "get_market_flow_rollup" (numeric sums, one
+-- row per market), which reads the per-minute rollup maintained from these events.
+
+CREATE INDEX IF NOT EXISTS "onchain-events_created_at_market_idx"
+    ON "public"."onchain-events" USING "btree" ("created_at", "market");
@@ -0,0 +1,112 @@
+-- Per-market, per-minute rollup of supply / withdraw / borrow / repay flows.
+-- Maintained by a trigger on "onchain-events", so window queries read
+-- O(buckets) rows instead of re-aggregating every raw event.
+
+CREATE TABLE IF NOT EXISTS "public"."market-flow-rollups" (
+    "market" "text" NOT NULL,
+    "bucket" timestamp with time zone NOT NULL,
+    "supply" numeric DEFAULT 0 NOT NULL,
+    "withdraw" numeric DEFAULT 0 NOT NULL,
+    "borrow" numeric DEFAULT 0 NOT NULL,
+    "repay" numeric DEFAULT 0 NOT NULL,
+    "event_count" bigint DEFAULT 0 NOT NULL
+);
+
+
+ALTER TABLE "public"."market-flow-rollups" OWNER TO "postgres";
+
+
+ALTER TABLE ONLY "public"."market-flow-rollups"
+    ADD CONSTRAINT "market-flow-rollups_pkey" PRIMARY KEY ("market", "bucket");
+
+
+CREATE INDEX IF NOT EXISTS "market-flow-rollups_bucket_idx"
+    ON "public"."market-flow-rollups" USING "btree" ("bucket");
+
+
+CREATE OR REPLACE FUNCTION "public"."rollup_onchain_event"() RETURNS "trigger"
+    LANGUAGE "plpgsql" SECURITY DEFINER
+    SET "search_path" TO ''
+AS $$
+BEGIN
+    IF NEW."market" IS NULL OR NEW."event" NOT IN ('supply', 'withdraw', 'borrow', 'repay') THEN
+        RETURN NEW;
+    END IF;
+
+    INSERT INTO "public"."market-flow-rollups" AS r ("market", "bucket", "supply", "withdraw", "borrow", "repay", "event_count")
+    VALUES (
+        NEW."market",
+        date_trunc('minute', NEW."created_at"),
+        CASE WHEN NEW."event" = 'supply' THEN COALESCE(NEW."amount", 0) ELSE 0 END,
+        CASE WHEN NEW."event" = 'withdraw' THEN COALESCE(NEW."amount", 0) ELSE 0 END,
+        CASE WHEN NEW."event" = 'borrow' THEN COALESCE(NEW."amount", 0) ELSE 0 END,
+        CASE WHEN NEW."event" = 'repay' THEN COALESCE(NEW."amount", 0) ELSE 0 END,
+        1
+    )
+    ON CONFLICT ("market", "bucket") DO UPDATE SET
+        "supply" = r."supply" + EXCLUDED."supply",
+        "withdraw" = r."withdraw" + EXCLUDED."withdraw",
+        "borrow" = r."borrow" + EXCLUDED."borrow",
+        "repay" = r."repay" + EXCLUDED."repay",
+        "event_count" = r."event_count" + 1;
+
+    RETURN NEW;
+END;
+$$;
+
+
+ALTER FUNCTION "public"."rollup_onchain_event"() OWNER TO "postgres";
+
+
+CREATE OR REPLACE TRIGGER "onchain-events_rollup"
+    AFTER INSERT ON "public"."onchain-events"
+    FOR EACH ROW EXECUTE FUNCTION "public"."rollup_onchain_event"();
+
+
+-- Backfill from the events stored so far
+INSERT INTO "public"."market-flow-rollups" ("market", "bucket", "supply", "withdraw", "borrow", "repay", "event_count")
+SELECT
+    "market",
+    date_trunc('minute', "created_at"),
+    COALESCE(SUM("amount") FILTER (WHERE "event" = 'supply'), 0),
+    COALESCE(SUM("amount") FILTER (WHERE "event" = 'withdraw'), 0),
+    COALESCE(SUM("amount") FILTER (WHERE "event" = 'borrow'), 0),
+    COALESCE(SUM("amount") FILTER (WHERE "event" = 'repay'), 0),
+    COUNT(*)
+FROM "public"."onchain-events"
+WHERE "market" IS NOT NULL AND "event" IN ('supply', 'withdraw', 'borrow', 'repay')
+GROUP BY "market", date_trunc('minute', "created_at")
+ON CONFLICT ("market", "bucket") DO NOTHING;
+
+
+CREATE OR REPLACE FUNCTION "public"."get_market_flow_rollup"(
+    "start_time" timestamp with time zone,
+    "end_time" timestamp with time zone DEFAULT "now"()
+)
+RETURNS TABLE ("market" "text", "supply" numeric, "withdraw" numeric, "borrow" numeric, "repay" numeric, "event_count" bigint)
+LANGUAGE "sql" STABLE
+AS $$
+    SELECT r."market", SUM(r."supply"), SUM(r."withdraw"), SUM(r."borrow"), SUM(r."repay"), SUM(r."event_count")::bigint
+    FROM "public"."market-flow-rollups" r
+    WHERE r."bucket" >= date_trunc('minute', "start_time")
+      AND r."bucket" <= "end_time"
+    GROUP BY r."market";
+$$;
+
+
+ALTER FUNCTION "public"."get_market_flow_rollup"(timestamp with time zone, timestamp with time zone) OWNER TO "postgres";
+
+
+CREATE POLICY "Enable read access for all users" ON "public"."market-flow-rollups" FOR SELECT TO "anon" USING (true);
+
+
+ALTER TABLE "public"."market-flow-rollups" ENABLE ROW LEVEL SECURITY;
+
+
+GRANT ALL ON TABLE "public"."market-flow-rollups" TO "anon";
+GRANT ALL ON TABLE "public"."market-flow-rollups" TO "authenticated";
+GRANT ALL ON TABLE "public"."market-flow-rollups" TO "service_role";
+
+GRANT ALL ON FUNCTION "public"."get_market_flow_rollup"(timestamp with time zone, timestamp with time zone) TO "anon";
+GRANT ALL ON FUNCTION "public"."get_market_flow_rollup"(timestamp with time zone, timestamp with time zone) TO "authenticated";
+GRANT ALL ON FUNCTION "public"."get_market_flow_rollup"(timestamp with time zone, timestamp with time zone) TO "service_role";
@@ -0,0 +1,25 @@
+-- Idempotency keys for rows shipped from the local outbox.
+-- A batch is upserted with ON CONFLICT ("idempotency_key") DO NOTHING, so
+-- resending a batch whose response was lost never duplicates rows.
+
+ALTER TABLE IF EXISTS "public"."user-messages" ADD COLUMN IF NOT EXISTS "idempotency_key" "text";
+ALTER TABLE IF EXISTS "public"."memories" ADD COLUMN IF NOT EXISTS "idempotency_key" "text";
+ALTER TABLE IF EXISTS "public"."activities" ADD COLUMN IF NOT EXISTS "idempotency_key" "text";
+ALTER TABLE IF EXISTS "public"."onchain-events" ADD COLUMN IF NOT EXISTS "idempotency_key" "text";
+ALTER TABLE IF EXISTS "public"."market-snapshots" ADD COLUMN IF NOT EXISTS "idempotency_key" "text";
+
+
+CREATE UNIQUE INDEX IF NOT EXISTS "user-messages_idempotency_key_key"
+    ON "public"."user-messages" USING "btree" ("idempotency_key");
+
+CREATE UNIQUE INDEX IF NOT EXISTS "memories_idempotency_key_key"
+    ON "public"."memories" USING "btree" ("idempotency_key");
+
+CREATE UNIQUE INDEX IF NOT EXISTS "activities_idempotency_key_key"
+    ON "public"."activities" USING "btree" ("idempotency_key");
+
+CREATE UNIQUE INDEX IF NOT EXISTS "onchain-events_idempotency_key_key"
+    ON "public"."onchain-events" USING "btree" ("idempotency_key");
+
+CREATE UNIQUE INDEX IF NOT EXISTS "market-snapshots_idempotency_key_key"
+    ON "public"."market-snapshots" USING "btree" ("idempotency_key");
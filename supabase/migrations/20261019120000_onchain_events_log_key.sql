@@ -0,0 +1,18 @@
+-- Identify each onchain event by its log, (tx_hash, log_index) is unique.
+-- Rescanned or overlapping block ranges are upserted with
+-- ON CONFLICT ("tx_hash", "log_index") DO NOTHING instead of double-counting flows.
+
+ALTER TABLE "public"."onchain-events"
+    ADD COLUMN IF NOT EXISTS "tx_hash" "text",
+    ADD COLUMN IF NOT EXISTS "log_index" integer,
+    ADD COLUMN IF NOT EXISTS "block_number" bigint;
+
+
+-- Older rows only have the hash in "data", their log index stays NULL
+UPDATE "public"."onchain-events"
+SET "tx_hash" = "data"->>'tx_hash'
+WHERE "tx_hash" IS NULL;
+
+
+ALTER TABLE ONLY "public"."onchain-events"
+    ADD CONSTRAINT "onchain-events_tx_hash_log_index_key" UNIQUE ("tx_hash", "log_index");
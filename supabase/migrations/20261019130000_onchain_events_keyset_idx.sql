@@ -0,0 +1,5 @@
+-- Keyset pagination over "onchain-events" by ("created_at", "id"): each page
+-- seeks from the last key it returned instead of scanning past an OFFSET.
+
+CREATE INDEX IF NOT EXISTS "onchain-events_created_at_id_idx"
+    ON "public"."onchain-events" USING "btree" ("created_at", "id");
@@ -0,0 +1,37 @@
+-- Activities store only the messages new to their run ("delta-v1"), linked to
+-- the previous activity of the same thread. Large message contents are stored
+-- once in "activity-blobs", compressed and keyed by their sha256.
+
+ALTER TABLE IF EXISTS "public"."activities"
+    ADD COLUMN IF NOT EXISTS "history_encoding" "text" DEFAULT 'full' NOT NULL,
+    ADD COLUMN IF NOT EXISTS "parent_activity_id" "text";
+
+
+CREATE TABLE IF NOT EXISTS "public"."activity-blobs" (
+    "hash" "text" NOT NULL,
+    "created_at" timestamp with time zone DEFAULT "now"() NOT NULL,
+    "encoding" "text" NOT NULL,
+    "data" "text" NOT NULL,
+    "idempotency_key" "text"
+);
+
+
+ALTER TABLE "public"."activity-blobs" OWNER TO "postgres";
+
+
+ALTER TABLE ONLY "public"."activity-blobs"
+    ADD CONSTRAINT "activity-blobs_pkey" PRIMARY KEY ("hash");
+
+
+CREATE POLICY "Enable insert for all users" ON "public"."activity-blobs" FOR INSERT TO "anon" WITH CHECK (true);
+
+
+CREATE POLICY "Enable read access for all users" ON "public"."activity-blobs" FOR SELECT TO "anon" USING (true);
+
+
+ALTER TABLE "public"."activity-blobs" ENABLE ROW LEVEL SECURITY;
+
+
+GRANT ALL ON TABLE "public"."activity-blobs" TO "anon";
+GRANT ALL ON TABLE "public"."activity-blobs" TO "authenticated";
+GRANT ALL ON TABLE "public"."activity-blobs" TO "service_role";
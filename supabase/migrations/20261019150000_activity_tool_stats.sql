@@ -0,0 +1,4 @@
+-- Tool memo hit rates of the run that produced the activity.
+
+ALTER TABLE IF EXISTS "public"."activities"
+    ADD COLUMN IF NOT EXISTS "tool_stats" "jsonb";